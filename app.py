@@ -1,5 +1,4 @@
 from fastapi import FastAPI, Depends
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import os
@@ -9,6 +8,9 @@ from bson.objectid import ObjectId # Keep for ID handling
 
 # Import database services
 from services.db_service import get_database, connect_to_mongo
+from services.worker_pool import shutdown_process_pool
+from services.static_files import CachedStaticFiles
+from services.metrics_service import RequestMetricsMiddleware
 
 # --- Robust .env Loading ---
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
@@ -26,6 +28,7 @@ async def lifespan(app: FastAPI):
     # Use the database connection lifespan from db_service
     async with connect_to_mongo():
         yield
+    shutdown_process_pool()
 # FastAPI app instance
 app = FastAPI(
     title="Angelo's Portfolio API",
@@ -55,11 +58,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link", "Server-Timing"], # Pagination headers read by the frontend; timings for devtools
 )
 
 # --- Mount Static Files Directory ---
 # This line makes the 'static' folder accessible under the '/static' path
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# CachedStaticFiles adds immutable caching for hashed uploads, .br/.gz siblings and byte ranges
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 # --- Import and Include FastAPI Routers ---
 # We will create these FastAPI routers in the next steps
@@ -69,9 +74,14 @@ from routes.contact import router as contact_router
 from routes.user import router as user_router # Assuming user routes will also be migrated
 from routes.admin import router as admin_router
 from routes.static_content import router as static_content_router
-from routes.upload import router as upload_router # Import the new upload router
+from routes.upload import router as upload_router, UploadSizeLimitMiddleware # Import the new upload router
 from routes.skill import router as skill_router # Import the new skill router
 from routes.hobby import router as hobby_router # Import the new hobby router
+from routes.media import router as media_router
+from routes.home import router as home_router
+from routes.search import router as search_router
+from routes.tags import router as tags_router
+from routes.metrics import router as metrics_router
 
 app.include_router(portfolio_router, prefix="/api")
 app.include_router(blog_router, prefix="/api")
@@ -80,8 +90,17 @@ app.include_router(user_router, prefix="/api") # Include user router
 app.include_router(admin_router, prefix="/api") # Include admin router
 app.include_router(static_content_router, prefix="/api")
 app.include_router(upload_router, prefix="/api") # Include the new upload router
+app.add_middleware(UploadSizeLimitMiddleware) # Cap upload bodies while they arrive, before the multipart parser spools them
 app.include_router(skill_router, prefix="/api") # Include the new skill router
 app.include_router(hobby_router, prefix="/api") # Include the new hobby router
+app.include_router(media_router, prefix="/api")
+app.include_router(home_router, prefix="/api")
+app.include_router(search_router, prefix="/api")
+app.include_router(tags_router, prefix="/api")
+app.include_router(metrics_router) # Prometheus scrape endpoint at /metrics, outside /api
+
+# Added last so it wraps every other middleware: per-route latency, Mongo attribution, Server-Timing
+app.add_middleware(RequestMetricsMiddleware)
 
 
 @app.get("/healthz")
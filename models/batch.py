@@ -0,0 +1,46 @@
+from typing import Generic, List, TypeVar
+
+from pydantic import BaseModel, Field
+
+from models.objectid_model import PydanticObjectId
+
+InT = TypeVar("InT")
+OutT = TypeVar("OutT")
+
+# Operations accepted in one batch request; each batch is a single bulk_write
+BATCH_MAX_OPERATIONS = 500
+
+
+class BatchUpdate(BaseModel, Generic[InT]):
+    id: PydanticObjectId
+    data: InT
+
+    class Config:
+        arbitrary_types_allowed = True # Allows PydanticObjectId
+
+
+class BatchRequest(BaseModel, Generic[InT]):
+    """Creates, updates and deletes applied in one request, in that order."""
+    create: List[InT] = Field(default_factory=list, max_length=BATCH_MAX_OPERATIONS)
+    update: List[BatchUpdate[InT]] = Field(default_factory=list, max_length=BATCH_MAX_OPERATIONS)
+    delete: List[PydanticObjectId] = Field(default_factory=list, max_length=BATCH_MAX_OPERATIONS)
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+class BatchResult(BaseModel, Generic[OutT]):
+    created: List[OutT] = []
+    updated: int = 0 # Update targets that exist; ids that matched nothing are not counted
+    deleted: int = 0
+
+
+class ReorderRequest(BaseModel):
+    """Ids in their new display order; the first id gets order 0."""
+    ids: List[PydanticObjectId] = Field(..., max_length=BATCH_MAX_OPERATIONS)
+
+    class Config:
+        arbitrary_types_allowed = True
+        json_schema_extra = {
+            "example": {"ids": ["60a724b00f7e4f00150974e6", "60a724b00f7e4f00150974e7"]}
+        }
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class TocEntry(BaseModel):
+    """One heading of a post's content, computed when the content is written (services/content_service.py)."""
+    level: int # 1-6, as in <h1>-<h6> or # to ######
+    text: str
+    id: str # Anchor: the heading's own id, else a GitHub-style slug of its text
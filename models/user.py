@@ -1,8 +1,18 @@
-from passlib.context import CryptContext
+import os
 from datetime import datetime
+from pymongo import ReturnDocument
 
-# Setup password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashing runs in a dedicated, bounded thread pool so bcrypt never blocks the event loop
+from services.password_service import hash_password, verify_and_update
+from services.cache_service import TTLCache
+
+# Authenticated users keyed by (email, token_version), filled by auth_service.get_current_user.
+# Local entries are dropped by update_password; other workers drop them after the TTL.
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+principal_cache = TTLCache(ttl_seconds=PRINCIPAL_CACHE_TTL_SECONDS, maxsize=256)
+
+def invalidate_principal(email):
+    principal_cache.discard_where(lambda key: key[0] == email)
 
 class UserModel:
     def __init__(self, db):
@@ -14,10 +24,11 @@ class UserModel:
             return None, 'Email 已被註冊'
         user = {
             'email': email,
-            'password_hash': pwd_context.hash(password),
+            'password_hash': await hash_password(password),
             'nickname': nickname or '',
             'created_at': datetime.utcnow(),
-            'last_login': None
+            'last_login': None,
+            'token_version': 0
         }
         result = await self.collection.insert_one(user)
         user['_id'] = result.inserted_id
@@ -30,10 +41,19 @@ class UserModel:
         user = await self.find_by_email(email)
         if not user:
             return False
-        return pwd_context.verify(password, user['password_hash'])
+        is_valid, new_hash = await verify_and_update(password, user['password_hash'])
+        if is_valid and new_hash:
+            # Transparently upgrade hashes made with an outdated scheme or cost
+            await self.collection.update_one({'_id': user['_id']}, {'$set': {'password_hash': new_hash}})
+        return is_valid
 
     async def update_last_login(self, email):
-        await self.collection.update_one({'email': email}, {'$set': {'last_login': datetime.utcnow()}})
+        """Records the login and returns the user, whose token_version goes into the issued token."""
+        return await self.collection.find_one_and_update(
+            {'email': email},
+            {'$set': {'last_login': datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
 
     async def set_reset_token(self, email, token, expire_time):
         await self.collection.update_one(
@@ -51,7 +71,14 @@ class UserModel:
         )
 
     async def update_password(self, email, new_password):
-        await self.collection.update_one(
+        """Stores the new password and returns the updated user, whose token_version goes into new tokens."""
+        new_hash = await hash_password(new_password)
+        # Bumping token_version revokes every token issued before the change
+        user = await self.collection.find_one_and_update(
             {'email': email},
-            {'$set': {'password_hash': pwd_context.hash(new_password)}}
+            {'$set': {'password_hash': new_hash}, '$inc': {'token_version': 1}},
+            return_document=ReturnDocument.AFTER
         )
+        invalidate_principal(email)
+        return user
+
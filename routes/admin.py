@@ -1,13 +1,39 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
+from pydantic import BaseModel, Field
 
 from services.auth_service import create_access_token, get_current_admin_user, ACCESS_TOKEN_EXPIRE_MINUTES
 from models.user import UserModel
 from services.db_service import get_database
+from services.password_service import PasswordHasherBusy
+from services.response_cache import get_response_cache_metrics
 
 router = APIRouter()
 
+
+class PasswordChangeRequest(BaseModel):
+    current_password: str
+    new_password: str = Field(..., min_length=8)
+
+
+def password_hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many login attempts in progress, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+def issue_token(user: dict) -> dict:
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        # "ver" ties the token to the user's token_version; a password change revokes it
+        data={"sub": user["email"], "ver": user.get("token_version", 0)}, expires_delta=access_token_expires
+    )
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
 @router.post("/admin/token", summary="Admin Login")
 async def login_for_access_token(db = Depends(get_database), form_data: OAuth2PasswordRequestForm = Depends()):
     """
@@ -16,7 +42,10 @@ async def login_for_access_token(db = Depends(get_database), form_data: OAuth2Pa
     """
     user_model = UserModel(db)
     # The 'username' from the form is the email
-    is_valid = await user_model.verify_password(email=form_data.username, password=form_data.password)
+    try:
+        is_valid = await user_model.verify_password(email=form_data.username, password=form_data.password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy()
 
     if not is_valid:
         raise HTTPException(
@@ -25,14 +54,31 @@ async def login_for_access_token(db = Depends(get_database), form_data: OAuth2Pa
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    await user_model.update_last_login(form_data.username)
+    user = await user_model.update_last_login(form_data.username)
+    return issue_token(user)
 
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": form_data.username}, expires_delta=access_token_expires
-    )
 
-    return {"access_token": access_token, "token_type": "bearer"}
+@router.put("/admin/password", summary="Change Admin Password")
+async def change_password(data: PasswordChangeRequest, db = Depends(get_database), current_user: dict = Depends(get_current_admin_user)):
+    """
+    Changes the current admin's password. Every token issued before the change stops working
+    (immediately on this worker, within PRINCIPAL_CACHE_TTL_SECONDS on the others), so a new
+    token is returned in the same shape as /admin/token.
+    """
+    user_model = UserModel(db)
+    email = current_user["email"]
+    try:
+        is_valid = await user_model.verify_password(email=email, password=data.current_password)
+        if not is_valid:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Current password is incorrect")
+        user = await user_model.update_password(email, data.new_password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy()
+
+    if user is None:
+        # The user no longer exists
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+    return issue_token(user)
 
 
 @router.get("/admin/me", summary="Get Current Admin User")
@@ -44,3 +90,11 @@ async def read_users_me(current_user: dict = Depends(get_current_admin_user)):
     # Note: It's better to return a Pydantic model of the user to avoid leaking sensitive data
     return {"email": current_user.get("email"), "nickname": current_user.get("nickname")}
 
+
+@router.get("/admin/cache-stats", summary="Response Cache Statistics")
+async def read_cache_stats(current_user: dict = Depends(get_current_admin_user)):
+    """
+    Hit rate, size and evictions of this worker's response cache.
+    Each uvicorn worker has its own cache, so numbers differ between requests.
+    """
+    return get_response_cache_metrics()
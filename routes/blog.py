@@ -1,43 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional, Any
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from typing import List, Optional, Tuple
 from bson.objectid import ObjectId
 from datetime import datetime
 import pytz
-from pydantic import BaseModel, Field, BeforeValidator, PlainSerializer
-from typing_extensions import Annotated
+from pydantic import BaseModel, Field
 from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import base64
 import sys
 
 # 【關鍵修正】: 從 services.db_service 導入 get_database，而不是 app
 # 這樣就打破了 app -> routes.blog -> app 的循環
+from models.batch import BatchRequest, BatchResult
+from models.content import TocEntry
+from models.objectid_model import PydanticObjectId
 from services.db_service import get_database 
 from services.auth_service import get_current_admin_user # Import the auth dependency
+from services.repository import Repository, literal, parse_object_id
+from services.http_cache import collection_validators, not_modified
+from services.json_service import ListSerializer
+from services.response_cache import CachedResponse, cached_json_response
+from services.content_service import make_excerpt, markdown_to_text, with_content_analysis
 
 
 
 router = APIRouter()
 
-# Pydantic V2 compatible ObjectId handling
-# Represents an ObjectId field in the database.
-def validate_object_id(v: Any) -> ObjectId:
-    if isinstance(v, ObjectId):
-        return v
-    if isinstance(v, str) and ObjectId.is_valid(v):
-        return ObjectId(v)
-    raise ValueError("Invalid ObjectId")
-
-def serialize_object_id(v: ObjectId) -> str:
-    """Converts ObjectId to str for JSON serialization."""
-    return str(v)
-
-# PydanticObjectId 添加了 PlainSerializer 來處理 ObjectId -> str 的 JSON 輸出
-PydanticObjectId = Annotated[
-    ObjectId, 
-    BeforeValidator(validate_object_id),
-    PlainSerializer(serialize_object_id, return_type=str), # 確保序列化為字串
-    Field(json_schema_extra={"type": "string", "example": "60a724b00f7e4f00150974e6"})
-]
-
 # Pydantic model for Blog Post item
 class BlogPostItem(BaseModel):
     id: Optional[PydanticObjectId] = Field(alias="_id", default=None)
@@ -50,6 +38,11 @@ class BlogPostItem(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(pytz.utc))
     published_at: Optional[datetime] = None # Datetime object
     updated_at: Optional[datetime] = None
+    # Derived from content on write; ignored on input
+    excerpt: Optional[str] = None
+    word_count: Optional[int] = None
+    reading_minutes: Optional[int] = None
+    toc: List[TocEntry] = []
 
     class Config:
         populate_by_name = True
@@ -65,54 +58,218 @@ class BlogPostItem(BaseModel):
             }
         }
 
+# List-view model: everything a post card needs, without the full HTML content
+class BlogPostSummary(BaseModel):
+    id: PydanticObjectId = Field(alias="_id")
+    title: str
+    subtitle: Optional[str] = None
+    excerpt: Optional[str] = None
+    cover_image: Optional[str] = None
+    tags: List[str] = []
+    is_published: bool = False
+    created_at: Optional[datetime] = None
+    published_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    reading_minutes: Optional[int] = None
+
+    class Config:
+        populate_by_name = True
+        arbitrary_types_allowed = True
+
+
+# For posts written before excerpts were stored, only the head of `content` leaves Mongo;
+# it is enough to build the excerpt from
+EXCERPT_SOURCE_LENGTH = 800
+
+def encode_cursor(post: dict) -> str:
+    published_at = post.get("published_at")
+    raw = f"{published_at.isoformat() if published_at else ''}|{post['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        published_at, post_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return (datetime.fromisoformat(published_at) if published_at else None), ObjectId(post_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="無效的分頁游標")
+
+def keyset_filter(cursor: str) -> dict:
+    """
+    Matches the posts that come after the cursor in (published_at desc, _id desc) order.
+    Posts without published_at sort last, so they follow every dated post.
+    """
+    published_at, post_id = decode_cursor(cursor)
+    if published_at is None:
+        return {"published_at": None, "_id": {"$lt": post_id}}
+    return {"$or": [
+        {"published_at": {"$lt": published_at}},
+        {"published_at": published_at, "_id": {"$lt": post_id}},
+        {"published_at": None},
+    ]}
+
+async def fetch_blog_summaries(
+    db, published_only: bool, limit: int, after: Optional[str] = None, tag: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Loads one page of list-view posts (no full content) and the cursor of the next page, if any.
+    Shared by GET /blog and the homepage bootstrap.
+    """
+    query = {}
+    if tag:
+        query['tags'] = tag # Multikey index tags_published_listing
+    if published_only:
+        query['is_published'] = True
+    if after:
+        query = {"$and": [query, keyset_filter(after)]}
+
+    projection = {field: 1 for field in BlogPostSummary.model_fields if field != "id"}
+    projection["content_head"] = {"$cond": [
+        {"$ifNull": ["$excerpt", False]},
+        "", # The stored excerpt is used
+        {"$substrCP": [{"$ifNull": ["$content", ""]}, 0, EXCERPT_SOURCE_LENGTH]},
+    ]}
+    pipeline = [
+        {"$match": query},
+        {"$sort": {"published_at": -1, "_id": -1}},
+        {"$limit": limit + 1}, # One extra row tells us whether a next page exists
+        {"$project": projection},
+    ]
+    posts = await db.blog_posts.aggregate(pipeline).to_list(limit + 1)
 
-@router.get("/blog", response_model=List[BlogPostItem], response_model_by_alias=False)
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(posts[-1])
+
+    for post in posts:
+        content_head = post.pop("content_head", None)
+        if post.get("excerpt") is None:
+            post["excerpt"] = make_excerpt(markdown_to_text(content_head))
+    return posts, next_cursor
+
+
+_summary_list_serializer = ListSerializer(BlogPostSummary)
+
+
+@router.get("/blog", response_model=List[BlogPostSummary], response_model_by_alias=False)
 async def get_all_blog_posts(
+    request: Request,
     # 修正 2: 使用 get_database
     db: AsyncIOMotorClient = Depends(get_database),
-    published_only: bool = Query(True, alias="publishedOnly") # Align with frontend naming
+    published_only: bool = Query(True, alias="publishedOnly"), # Align with frontend naming
+    limit: int = Query(20, ge=1, le=100),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    tag: Optional[str] = Query(None, max_length=100, description="Only posts with this tag; see /tags"),
 ):
+    """
+    Lists posts newest first, one page at a time.
+    The full content is not returned; use /blog/{post_id} for that.
+    """
     try:
-        query = {}
-        if published_only:
-            query['is_published'] = True
-        
-        posts = await db.blog_posts.find(query).sort("published_at", -1).to_list(1000)
-        
-        return posts
+        validators = await collection_validators(db, "blog_posts", "list", request.url.query)
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+
+        async def render() -> CachedResponse:
+            posts, next_cursor = await fetch_blog_summaries(db, published_only, limit, after, tag)
+            headers = {}
+            if next_cursor:
+                headers["X-Next-Cursor"] = next_cursor
+                headers["Link"] = f'<{request.url.include_query_params(after=next_cursor)}>; rel="next"'
+            return CachedResponse(_summary_list_serializer.dump(posts), headers)
+
+        return await cached_json_response(request, validators, render)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching blog posts list: {e}", file=sys.stderr)
         raise HTTPException(status_code=500, detail="無法獲取文章列表")
 
+INVALID_POST_ID = "無效的文章 ID 格式"
+
+
+def blog_repository(db) -> Repository[BlogPostItem]:
+    return Repository(db, "blog_posts", BlogPostItem)
+
+
+async def new_blog_doc(item: BlogPostItem) -> dict:
+    if item.id:
+        raise HTTPException(status_code=400, detail="Do not provide _id for new item creation")
+
+    if item.is_published and not item.published_at:
+        item.published_at = datetime.now(pytz.utc)
+
+    # 使用 Pydantic V2 的 model_dump
+    post_dict = item.model_dump(by_alias=True, exclude_unset=True)
+    if "_id" in post_dict and post_dict["_id"] is None:
+        del post_dict["_id"]
+    # Sanitized content plus excerpt, reading time and TOC, computed once here instead of on every read
+    return await with_content_analysis(post_dict)
+
+
+async def blog_update_pipeline(item: BlogPostItem) -> list:
+    """
+    Update pipeline for a post edit. It is a single atomic step; every expression sees
+    the stored document as it was before this update.
+    """
+    # 使用 Pydantic V2 的 model_dump
+    update_data = item.model_dump(by_alias=True, exclude_unset=True)
+    update_data.pop("id", None)
+    update_data.pop("_id", None)
+    update_data.pop("created_at", None) # Do not update created_at
+    update_data["updated_at"] = datetime.now(pytz.utc) # Set updated_at
+    update_data = await with_content_analysis(update_data)
+
+    fields = {key: literal(value) for key, value in update_data.items()}
+    if update_data.get('is_published'):
+        # Logic to handle publishing: stamp published_at only when a draft becomes published
+        unchanged = literal(update_data['published_at']) if 'published_at' in update_data else "$published_at"
+        fields['published_at'] = {"$cond": [{"$eq": ["$is_published", True]}, unchanged, literal(datetime.now(pytz.utc))]}
+    return [{"$set": fields}]
+
+
 @router.get("/blog/all", response_model=List[BlogPostItem], response_model_by_alias=False)
-async def get_all_blog_posts_admin(db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
+async def get_all_blog_posts_admin(
+    db: AsyncIOMotorClient = Depends(get_database),
+    admin_user: dict = Depends(get_current_admin_user),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=1000),
+):
     """
     Admin-only route to get all posts, including unpublished ones.
     """
     try:
-        posts = await db.blog_posts.find().sort("created_at", -1).to_list(1000)
+        posts = await blog_repository(db).find(sort=[("created_at", -1)], skip=skip, limit=limit)
         return posts
     except Exception as e:
         print(f"Error fetching all blog posts for admin: {e}", file=sys.stderr)
         raise HTTPException(status_code=500, detail="無法獲取所有文章列表")
 
 @router.get("/blog/{post_id}", response_model=BlogPostItem, response_model_by_alias=False)
-async def get_blog_post_by_id(post_id: str, db: AsyncIOMotorClient = Depends(get_database)):
+async def get_blog_post_by_id(post_id: str, request: Request, db: AsyncIOMotorClient = Depends(get_database)):
     try:
-        if not ObjectId.is_valid(post_id):
-            raise HTTPException(status_code=400, detail="無效的文章 ID 格式")
-        
-        post = await db.blog_posts.find_one({"_id": ObjectId(post_id)})
-        
-        if not post:
-            raise HTTPException(status_code=404, detail="找不到該文章")
-        
-        # Public route should not return unpublished posts unless specifically asked by an admin
-        # (which would be a different endpoint)
-        if not post.get('is_published', False):
-             raise HTTPException(status_code=404, detail="找不到該文章或未發布")
-        
-        return post
+        object_id = parse_object_id(post_id, INVALID_POST_ID)
+
+        validators = await collection_validators(db, "blog_posts", "detail", post_id)
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+
+        async def render() -> CachedResponse:
+            post = await blog_repository(db).get(object_id)
+
+            if not post:
+                raise HTTPException(status_code=404, detail="找不到該文章")
+
+            # Public route should not return unpublished posts unless specifically asked by an admin
+            # (which would be a different endpoint)
+            if not post.get('is_published', False):
+                 raise HTTPException(status_code=404, detail="找不到該文章或未發布")
+
+            return CachedResponse(BlogPostItem.model_validate(post).model_dump_json())
+
+        return await cached_json_response(request, validators, render)
     except HTTPException:
         raise
     except Exception as e:
@@ -122,56 +279,42 @@ async def get_blog_post_by_id(post_id: str, db: AsyncIOMotorClient = Depends(get
 # Admin routes (POST, PUT, DELETE) are now protected
 @router.post("/blog", response_model=BlogPostItem, response_model_by_alias=False, status_code=status.HTTP_201_CREATED)
 async def create_blog_post(item: BlogPostItem, db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
-    if item.id:
-        raise HTTPException(status_code=400, detail="Do not provide _id for new item creation")
-
-    if item.is_published and not item.published_at:
-        item.published_at = datetime.now(pytz.utc)
+    post_dict = await new_blog_doc(item)
 
     try:
-        # 使用 Pydantic V2 的 model_dump
-        post_dict = item.model_dump(by_alias=True, exclude_unset=True) 
-        if "_id" in post_dict and post_dict["_id"] is None:
-            del post_dict["_id"]
-
-        result = await db.blog_posts.insert_one(post_dict)
-        
-        created_item = await db.blog_posts.find_one({"_id": result.inserted_id})
+        created_item = await blog_repository(db).insert(post_dict)
         return created_item
     except Exception as e:
         print(f"Error creating blog post: {e}", file=sys.stderr)
         raise HTTPException(status_code=500, detail=f"伺服器錯誤: {e}")
 
+@router.post("/blog/batch", response_model=BatchResult[BlogPostItem], response_model_by_alias=False)
+async def batch_blog_posts(batch: BatchRequest[BlogPostItem], db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
+    """
+    批次新增、更新（含發布）與刪除文章：一次請求、一次資料庫往返。
+    """
+    new_docs = await asyncio.gather(*(new_blog_doc(item) for item in batch.create))
+
+    try:
+        pipelines = await asyncio.gather(*(blog_update_pipeline(update.data) for update in batch.update))
+        outcome = await blog_repository(db).bulk(
+            inserts=new_docs,
+            updates=[(update.id, pipeline) for update, pipeline in zip(batch.update, pipelines)],
+            deletes=batch.delete,
+        )
+        return {"created": outcome.inserted, "updated": outcome.matched, "deleted": outcome.deleted}
+    except Exception as e:
+        print(f"Error in blog batch: {e}", file=sys.stderr)
+        raise HTTPException(status_code=500, detail=f"伺服器錯誤: {e}")
+
 @router.put("/blog/{post_id}", response_model=BlogPostItem, response_model_by_alias=False)
 async def update_blog_post(post_id: str, item: BlogPostItem, db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
     try:
-        if not ObjectId.is_valid(post_id):
-            raise HTTPException(status_code=400, detail="無效的文章 ID 格式")
-        
-        # 使用 Pydantic V2 的 model_dump
-        update_data = item.model_dump(by_alias=True, exclude_unset=True)
-        update_data.pop("id", None)
-        update_data.pop("_id", None)
-        update_data.pop("created_at", None) # Do not update created_at
-        update_data["updated_at"] = datetime.now(pytz.utc) # Set updated_at
-
-        # Logic to handle publishing
-        existing_post = await db.blog_posts.find_one({"_id": ObjectId(post_id)})
-        if not existing_post:
-            raise HTTPException(status_code=404, detail="找不到該文章")
+        object_id = parse_object_id(post_id, INVALID_POST_ID)
 
-        is_being_published = not existing_post.get('is_published') and update_data.get('is_published')
-        if is_being_published:
-            update_data['published_at'] = datetime.now(pytz.utc)
-
-        result = await db.blog_posts.update_one(
-            {"_id": ObjectId(post_id)},
-            {"$set": update_data}
-        )
-        if result.matched_count == 0:
+        updated_item = await blog_repository(db).update(object_id, await blog_update_pipeline(item))
+        if not updated_item:
             raise HTTPException(status_code=404, detail="找不到該文章")
-        
-        updated_item = await db.blog_posts.find_one({"_id": ObjectId(post_id)})
         return updated_item
     except HTTPException:
         raise
@@ -182,12 +325,7 @@ async def update_blog_post(post_id: str, item: BlogPostItem, db: AsyncIOMotorCli
 @router.delete("/blog/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_blog_post(post_id: str, db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
     try:
-        if not ObjectId.is_valid(post_id):
-            raise HTTPException(status_code=400, detail="無效的文章 ID 格式")
-        
-        result = await db.blog_posts.delete_one({"_id": ObjectId(post_id)})
-        
-        if result.deleted_count == 0:
+        if not await blog_repository(db).delete(parse_object_id(post_id, INVALID_POST_ID)):
             raise HTTPException(status_code=404, detail="找不到該文章")
         
         return # 204 No Content for successful deletion
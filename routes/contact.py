@@ -1,27 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Optional, List, Any
+from typing import Optional, List
 from bson.objectid import ObjectId
 from datetime import datetime
 import pytz
-from pydantic import BaseModel, Field, EmailStr, BeforeValidator
-from typing_extensions import Annotated
+from pydantic import BaseModel, Field, EmailStr
 from motor.motor_asyncio import AsyncIOMotorClient
 import re # Keep re for email validation if not relying solely on Pydantic EmailStr (though EmailStr is usually enough)
+from models.objectid_model import PydanticObjectId
 from services.db_service import get_database # Corrected import for the dependency
 
 router = APIRouter()
 
-# Pydantic V2 compatible ObjectId handling
-def validate_object_id(v: Any) -> ObjectId:
-    if isinstance(v, ObjectId):
-        return v
-    if isinstance(v, str) and ObjectId.is_valid(v):
-        return ObjectId(v)
-    raise ValueError("Invalid ObjectId")
-
-PydanticObjectId = Annotated[ObjectId, BeforeValidator(validate_object_id)]
-
-
 # Pydantic model for Contact Form submission
 class ContactFormRequest(BaseModel):
     name: str = Field(..., min_length=1, description="發送者的姓名")
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from typing import List, Optional
 from pydantic import BaseModel, Field
 from motor.motor_asyncio import AsyncIOMotorClient
-from bson import ObjectId
 
+from models.batch import BatchRequest, BatchResult, ReorderRequest
 from models.objectid_model import PydanticObjectId
 from services.db_service import get_database
 from services.auth_service import get_current_admin_user
+from services.repository import ORDER_FIELD, Repository, creation_order, parse_object_id
+from services.http_cache import collection_validators, not_modified
+from services.json_service import ListSerializer
+from services.response_cache import CachedResponse, cached_json_response
 
 router = APIRouter()
 
@@ -16,6 +20,7 @@ class HobbyIn(BaseModel):
     name: str # e.g., "跑步"
     icon: str # FontAwesome class or name, e.g., "faRunning"
     description: Optional[str] = None # e.g., "每週三次 5K，享受腦內啡"
+    order: Optional[int] = None # Position in the list; new hobbies go last, PUT /hobbies/order rewrites it
 
     class Config:
         json_schema_extra = {
@@ -31,6 +36,7 @@ class HobbyOut(BaseModel):
     name: str
     icon: str
     description: Optional[str] = None
+    order: Optional[int] = None
 
     class Config:
         populate_by_name = True
@@ -44,48 +50,76 @@ class HobbyOut(BaseModel):
             }
         }
 
+_hobby_list_serializer = ListSerializer(HobbyOut)
+
+HOBBY_SORT = [(ORDER_FIELD, 1), ("_id", 1)]
+
+
+def hobby_repository(db) -> Repository[HobbyOut]:
+    return Repository(db, "hobbies", HobbyOut)
+
+
+async def fetch_hobbies(db) -> List[dict]:
+    """All hobbies in display order. Shared by GET /hobbies and the homepage bootstrap."""
+    return await hobby_repository(db).find(sort=HOBBY_SORT, limit=100)
+
+
+def new_hobby_doc(hobby: HobbyIn) -> dict:
+    hobby_dict = hobby.model_dump()
+    if hobby_dict[ORDER_FIELD] is None:
+        hobby_dict[ORDER_FIELD] = creation_order()
+    return hobby_dict
+
 # --- Endpoints ---
 
 @router.get("/hobbies", response_model=List[HobbyOut], response_model_by_alias=False, tags=["Hobbies"])
-async def get_hobbies(db: AsyncIOMotorClient = Depends(get_database)):
+async def get_hobbies(request: Request, db: AsyncIOMotorClient = Depends(get_database)):
     """Fetch all hobbies."""
-    hobbies = await db.hobbies.find().to_list(100)
-    return hobbies
+    validators = await collection_validators(db, "hobbies", "list")
+    cached = not_modified(request, validators)
+    if cached:
+        return cached
+
+    async def render() -> CachedResponse:
+        hobbies = await fetch_hobbies(db)
+        return CachedResponse(_hobby_list_serializer.dump(hobbies))
+
+    return await cached_json_response(request, validators, render)
 
 @router.post("/hobbies", response_model=HobbyOut, response_model_by_alias=False, status_code=status.HTTP_201_CREATED, tags=["Hobbies"])
 async def create_hobby(hobby: HobbyIn, db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
     """Create a new hobby (Admin only)."""
-    hobby_dict = hobby.model_dump()
-    result = await db.hobbies.insert_one(hobby_dict)
-    created_hobby = await db.hobbies.find_one({"_id": result.inserted_id})
+    created_hobby = await hobby_repository(db).insert(new_hobby_doc(hobby))
     return created_hobby
 
+@router.post("/hobbies/batch", response_model=BatchResult[HobbyOut], response_model_by_alias=False, tags=["Hobbies"])
+async def batch_hobbies(batch: BatchRequest[HobbyIn], db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
+    """Create, update and delete several hobbies in one request and one database round-trip (Admin only)."""
+    outcome = await hobby_repository(db).bulk(
+        inserts=[new_hobby_doc(hobby) for hobby in batch.create],
+        updates=[(item.id, {"$set": item.data.model_dump(exclude_unset=True)}) for item in batch.update],
+        deletes=batch.delete,
+    )
+    return {"created": outcome.inserted, "updated": outcome.matched, "deleted": outcome.deleted}
+
+@router.put("/hobbies/order", status_code=status.HTTP_204_NO_CONTENT, tags=["Hobbies"])
+async def reorder_hobbies(reorder: ReorderRequest, db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
+    """Set the display order of the hobbies: `ids` from first to last (Admin only)."""
+    await hobby_repository(db).reorder(reorder.ids)
+
 @router.put("/hobbies/{hobby_id}", response_model=HobbyOut, response_model_by_alias=False, tags=["Hobbies"])
 async def update_hobby(hobby_id: str, hobby_update: HobbyIn, db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
     """Update a hobby (Admin only)."""
-    if not ObjectId.is_valid(hobby_id):
-        raise HTTPException(status_code=400, detail="Invalid ID")
-    
     update_data = hobby_update.model_dump(exclude_unset=True)
     
-    result = await db.hobbies.update_one(
-        {"_id": ObjectId(hobby_id)},
-        {"$set": update_data}
-    )
+    updated_hobby = await hobby_repository(db).set_fields(parse_object_id(hobby_id), update_data)
     
-    if result.matched_count == 0:
+    if updated_hobby is None:
         raise HTTPException(status_code=404, detail="Hobby not found")
-        
-    updated_hobby = await db.hobbies.find_one({"_id": ObjectId(hobby_id)})
     return updated_hobby
 
 @router.delete("/hobbies/{hobby_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Hobbies"])
 async def delete_hobby(hobby_id: str, db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
     """Delete a hobby (Admin only)."""
-    if not ObjectId.is_valid(hobby_id):
-        raise HTTPException(status_code=400, detail="Invalid ID")
-        
-    result = await db.hobbies.delete_one({"_id": ObjectId(hobby_id)})
-    
-    if result.deleted_count == 0:
+    if not await hobby_repository(db).delete(parse_object_id(hobby_id)):
         raise HTTPException(status_code=404, detail="Hobby not found")
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List
+from pydantic import BaseModel
+from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import sys
+
+from models.hero_settings import HeroSettings
+from models.site_settings import SiteSettings
+from routes.blog import BlogPostSummary, fetch_blog_summaries
+from routes.hobby import HobbyOut, fetch_hobbies
+from routes.portfolio import PortfolioSummary
+from routes.skill import SkillOut, fetch_skills
+from services.db_service import get_database
+from services.http_cache import combined_validators, not_modified
+from services.json_service import ListSerializer
+from services.repository import Repository
+from services.response_cache import CachedResponse, cached_json_response
+from services.static_content_service import StaticContentService
+
+router = APIRouter()
+
+# Every collection the homepage payload is built from; a write to any of them changes the ETag
+HOME_COLLECTIONS = ("settings", "skills", "hobbies", "portfolio", "blog_posts")
+
+_skills_serializer = ListSerializer(SkillOut)
+_hobbies_serializer = ListSerializer(HobbyOut)
+_portfolio_serializer = ListSerializer(PortfolioSummary)
+_blog_serializer = ListSerializer(BlogPostSummary)
+
+
+class HomeBootstrap(BaseModel):
+    site_settings: SiteSettings
+    hero_settings: HeroSettings
+    skills: List[SkillOut]
+    hobbies: List[HobbyOut]
+    portfolio: List[PortfolioSummary]
+    blog: List[BlogPostSummary]
+
+
+@router.get("/home", response_model=HomeBootstrap, summary="Homepage Bootstrap")
+async def get_home_bootstrap(
+    request: Request,
+    db: AsyncIOMotorClient = Depends(get_database),
+    blog_limit: int = Query(6, ge=1, le=50, alias="blogLimit"),
+):
+    """
+    Everything the homepage renders, in one round-trip: settings, skills, hobbies,
+    portfolio cards and the latest blog posts (list views, without full content).
+    Each section has the same shape as its standalone endpoint; settings keep `_id`.
+    """
+    try:
+        validators = await combined_validators(db, HOME_COLLECTIONS, request.url.query)
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+
+        async def render() -> CachedResponse:
+            static_content_service = StaticContentService(db)
+            site_json, hero_json, skills, hobbies, portfolio, (posts, _) = await asyncio.gather(
+                static_content_service.get_site_settings_json(),
+                static_content_service.get_hero_settings_json(),
+                fetch_skills(db),
+                fetch_hobbies(db),
+                Repository(db, "portfolio", PortfolioSummary).find(sort=[("created_at", -1)]),
+                fetch_blog_summaries(db, published_only=True, limit=blog_limit),
+            )
+
+            # Assemble the JSON from already-serialized parts; the settings bytes come straight from the cache
+            return CachedResponse(b"".join((
+                b'{"site_settings":', site_json,
+                b',"hero_settings":', hero_json,
+                b',"skills":', _skills_serializer.dump(skills),
+                b',"hobbies":', _hobbies_serializer.dump(hobbies),
+                b',"portfolio":', _portfolio_serializer.dump(portfolio),
+                b',"blog":', _blog_serializer.dump(posts),
+                b'}',
+            )))
+
+        return await cached_json_response(request, validators, render)
+    except Exception as e:
+        print(f"Error building homepage bootstrap: {e}", file=sys.stderr)
+        raise HTTPException(status_code=500, detail="無法獲取首頁資料")
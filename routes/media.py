@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import RedirectResponse
+from typing import List, Optional
+from pydantic import BaseModel
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+
+from services.db_service import get_database
+from services.image_service import MEDIA_COLLECTION, UPLOAD_DIR, pick_variant
+
+router = APIRouter()
+
+# --- Models ---
+
+class ImageVariant(BaseModel):
+    width: int
+    height: int
+    format: str
+    url: str
+
+class MediaInfo(BaseModel):
+    url: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    variants: List[ImageVariant] = []
+
+# --- Endpoints ---
+
+@router.get("/media/{filename}", tags=["Media"])
+async def get_media(filename: str, w: int = Query(..., ge=1, le=4096, description="Desired display width in pixels"), db: AsyncIOMotorClient = Depends(get_database)):
+    """
+    Redirects to the smallest generated variant that is at least `w` pixels wide.
+    Falls back to the original upload while its variants are still being generated.
+    """
+    if os.path.basename(filename) != filename or not os.path.isfile(os.path.join(UPLOAD_DIR, filename)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+
+    media_doc = await db[MEDIA_COLLECTION].find_one({"_id": filename}, {"variants": 1})
+    variant = pick_variant(media_doc, w) if media_doc else None
+    target = variant["url"] if variant else f"/{UPLOAD_DIR}/{filename}"
+    return RedirectResponse(target, status_code=status.HTTP_302_FOUND)
+
+@router.get("/media/{filename}/variants", response_model=MediaInfo, tags=["Media"])
+async def get_media_variants(filename: str, db: AsyncIOMotorClient = Depends(get_database)):
+    """Returns the original dimensions and every generated variant, e.g. for building a srcset."""
+    media_doc = await db[MEDIA_COLLECTION].find_one({"_id": filename})
+    if not media_doc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No variants recorded for this image")
+    return media_doc
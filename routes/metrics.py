@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import hmac
+import os
+
+from services.metrics_service import render_metrics
+from services.password_service import get_password_hash_metrics
+from services.response_cache import get_response_cache_metrics
+from services.search_service import get_search_index_metrics
+
+router = APIRouter()
+
+# When set, scrapers must send "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """
+    Prometheus scrape endpoint for this worker: request latency per route, Mongo commands
+    per request and per collection, slow commands, the password hasher, the response cache and the search index.
+    """
+    if METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    body = render_metrics({
+        "password_hash": get_password_hash_metrics(),
+        "response_cache": get_response_cache_metrics(),
+        "search_index": get_search_index_metrics(),
+    })
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from typing import List, Optional, Any
-from bson.objectid import ObjectId
 from datetime import datetime
 from pydantic import BaseModel, Field
 from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 import sys
 
+from models.batch import BatchRequest, BatchResult
+from models.content import TocEntry
 from models.objectid_model import PydanticObjectId # Import PydanticObjectId
 from services.db_service import get_database # Import the actual dependency generator
 from services.auth_service import get_current_admin_user # Import the auth dependency
+from services.content_service import with_content_analysis
+from services.repository import Repository, parse_object_id
+from services.http_cache import collection_validators, not_modified
+from services.json_service import ListSerializer
+from services.response_cache import CachedResponse, cached_json_response
 
 #     from app import get_database
 #     return await get_database()
@@ -27,6 +34,11 @@ class PortfolioItem(BaseModel):
     tags: List[str] = []
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: Optional[datetime] = None
+    # Derived from content on write; ignored on input
+    excerpt: Optional[str] = None
+    word_count: Optional[int] = None
+    reading_minutes: Optional[int] = None
+    toc: List[TocEntry] = []
 
     class Config:
         populate_by_name = True # Replaces allow_population_by_field_name
@@ -45,30 +57,97 @@ class PortfolioItem(BaseModel):
         # Pydantic V2's dumps/loads handles ObjectId -> str conversion automatically with Annotated type
 
 
+# List-view model used by the homepage bootstrap: a card's fields without the HTML content
+class PortfolioSummary(BaseModel):
+    id: PydanticObjectId = Field(alias="_id")
+    title: str
+    description: str
+    image_url: Optional[str] = None
+    github_url: Optional[str] = None
+    demo_url: Optional[str] = None
+    tags: List[str] = []
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        populate_by_name = True
+        arbitrary_types_allowed = True
+
+
+_portfolio_list_serializer = ListSerializer(PortfolioItem)
+
+INVALID_PORTFOLIO_ID = "無效的作品 ID 格式"
+
+
+def portfolio_repository(db) -> Repository[PortfolioItem]:
+    return Repository(db, "portfolio", PortfolioItem)
+
+
+async def new_portfolio_doc(item: PortfolioItem) -> dict:
+    # item.created_at is already set by default_factory
+    if item.id:
+        # PydanticObjectId should handle the conversion to ObjectId if provided
+        raise HTTPException(status_code=400, detail="Do not provide _id for new item creation")
+    # 使用 exclude_none=True 自動過濾值為 None 的欄位（如未提供的 _id）
+    # by_alias=True 確保產生的 key 是符合 MongoDB 的 _id
+    # Sanitized content plus excerpt, reading time and TOC, computed once here instead of on every read
+    return await with_content_analysis(item.model_dump(by_alias=True, exclude_none=True))
+
+
+async def portfolio_update_fields(item: PortfolioItem) -> dict:
+    # 使用 Pydantic V2 的 model_dump 方法
+    update_data = item.model_dump(by_alias=True, exclude_unset=True)
+
+    # Don't allow changing ID or created_at via PUT
+    update_data.pop("id", None)
+    update_data.pop("_id", None) # Ensure _id is not updated
+    update_data.pop("created_at", None)
+    update_data["updated_at"] = datetime.now() # Set updated_at
+    return await with_content_analysis(update_data)
+
+
 @router.get("/portfolio", response_model=List[PortfolioItem], response_model_by_alias=False)
-async def get_all_portfolio(db: AsyncIOMotorClient = Depends(get_database)):
+async def get_all_portfolio(
+    request: Request,
+    db: AsyncIOMotorClient = Depends(get_database),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=1000),
+    tag: Optional[str] = Query(None, max_length=100, description="Only items with this tag; see /tags"),
+):
     try:
-        # Pydantic V2's response_model會自動處理ObjectId到str的轉換
-        portfolios = await db.portfolio.find().sort("created_at", -1).to_list(1000)
-        
-        return portfolios
+        validators = await collection_validators(db, "portfolio", "list", request.url.query)
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+
+        async def render() -> CachedResponse:
+            # 序列化結果會被快取，命中時不再查詢資料庫也不再經過 Pydantic
+            query = {"tags": tag} if tag else {} # Multikey index tags_created_at
+            portfolios = await portfolio_repository(db).find(query, sort=[("created_at", -1)], skip=skip, limit=limit)
+            return CachedResponse(_portfolio_list_serializer.dump(portfolios))
+
+        return await cached_json_response(request, validators, render)
     except Exception as e:
         print(f"Error fetching portfolio list: {e}", file=sys.stderr)
         raise HTTPException(status_code=500, detail="無法獲取作品列表")
 
 @router.get("/portfolio/{portfolio_id}", response_model=PortfolioItem, response_model_by_alias=False)
-async def get_portfolio_by_id(portfolio_id: str, db: AsyncIOMotorClient = Depends(get_database)):
+async def get_portfolio_by_id(portfolio_id: str, request: Request, db: AsyncIOMotorClient = Depends(get_database)):
     try:
-        if not ObjectId.is_valid(portfolio_id):
-            raise HTTPException(status_code=400, detail="無效的作品 ID 格式")
-        
-        # Pydantic V2's response_model會自動處理ObjectId到str的轉換
-        portfolio = await db.portfolio.find_one({"_id": ObjectId(portfolio_id)})
-        
-        if not portfolio:
-            raise HTTPException(status_code=404, detail="找不到該作品")
-        
-        return portfolio
+        object_id = parse_object_id(portfolio_id, INVALID_PORTFOLIO_ID)
+
+        validators = await collection_validators(db, "portfolio", "detail", portfolio_id)
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+
+        async def render() -> CachedResponse:
+            portfolio = await portfolio_repository(db).get(object_id)
+            if not portfolio:
+                raise HTTPException(status_code=404, detail="找不到該作品")
+            return CachedResponse(PortfolioItem.model_validate(portfolio).model_dump_json())
+
+        return await cached_json_response(request, validators, render)
     except HTTPException:
         raise
     except Exception as e:
@@ -78,58 +157,44 @@ async def get_portfolio_by_id(portfolio_id: str, db: AsyncIOMotorClient = Depend
 # Admin routes (POST, PUT, DELETE) are now protected.
 @router.post("/portfolio", response_model=PortfolioItem, response_model_by_alias=False, status_code=status.HTTP_201_CREATED)
 async def create_portfolio(item: PortfolioItem, db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
-    # item.created_at is already set by default_factory
-    if item.id:
-        # PydanticObjectId should handle the conversion to ObjectId if provided
-        raise HTTPException(status_code=400, detail="Do not provide _id for new item creation")
+    portfolio_dict = await new_portfolio_doc(item)
 
     try:
-        # Convert Pydantic model to dictionary for MongoDB insertion
-        # by_alias=True ensures 'id' is converted back to '_id'
-        portfolio_dict = item.model_dump(by_alias=True, exclude_unset=True) 
-        
-        # remove the id field if it's default None
-        # 使用 Pydantic V2 的 model_dump 方法
-        if "_id" in portfolio_dict and portfolio_dict["_id"] is None:
-            del portfolio_dict["_id"]
-        # 使用 exclude_none=True 自動過濾值為 None 的欄位（如未提供的 _id）
-        # by_alias=True 確保產生的 key 是符合 MongoDB 的 _id
-        portfolio_dict = item.model_dump(by_alias=True, exclude_none=True)
-
-        result = await db.portfolio.insert_one(portfolio_dict)
-        
         # Return the created item with the generated ID
-        created_item = await db.portfolio.find_one({"_id": result.inserted_id})
+        created_item = await portfolio_repository(db).insert(portfolio_dict)
         return created_item
     except Exception as e:
         print(f"Error creating portfolio item: {e}", file=sys.stderr)
         raise HTTPException(status_code=500, detail=f"伺服器錯誤: {e}")
 
+@router.post("/portfolio/batch", response_model=BatchResult[PortfolioItem], response_model_by_alias=False)
+async def batch_portfolio(batch: BatchRequest[PortfolioItem], db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
+    """
+    批次新增、更新與刪除作品：一次請求、一次資料庫往返。
+    """
+    new_docs = await asyncio.gather(*(new_portfolio_doc(item) for item in batch.create))
+
+    try:
+        update_fields = await asyncio.gather(*(portfolio_update_fields(update.data) for update in batch.update))
+        outcome = await portfolio_repository(db).bulk(
+            inserts=new_docs,
+            updates=[(update.id, {"$set": fields}) for update, fields in zip(batch.update, update_fields)],
+            deletes=batch.delete,
+        )
+        return {"created": outcome.inserted, "updated": outcome.matched, "deleted": outcome.deleted}
+    except Exception as e:
+        print(f"Error in portfolio batch: {e}", file=sys.stderr)
+        raise HTTPException(status_code=500, detail=f"伺服器錯誤: {e}")
+
 @router.put("/portfolio/{portfolio_id}", response_model=PortfolioItem, response_model_by_alias=False)
 async def update_portfolio(portfolio_id: str, item: PortfolioItem, db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
     try:
-        if not ObjectId.is_valid(portfolio_id):
-            raise HTTPException(status_code=400, detail="無效的作品 ID 格式")
+        object_id = parse_object_id(portfolio_id, INVALID_PORTFOLIO_ID)
 
-        # 使用 Pydantic V2 的 model_dump 方法
-        update_data = item.model_dump(by_alias=True, exclude_unset=True)
-        
-        # Don't allow changing ID or created_at via PUT
-        update_data.pop("id", None)
-        update_data.pop("_id", None) # Ensure _id is not updated
-        update_data.pop("created_at", None)
-        update_data["updated_at"] = datetime.now() # Set updated_at
-
-        result = await db.portfolio.update_one(
-            {"_id": ObjectId(portfolio_id)},
-            {"$set": update_data}
-        )
-
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="找不到該作品")
-        
         # Return the updated item
-        updated_item = await db.portfolio.find_one({"_id": ObjectId(portfolio_id)})
+        updated_item = await portfolio_repository(db).set_fields(object_id, await portfolio_update_fields(item))
+        if not updated_item:
+            raise HTTPException(status_code=404, detail="找不到該作品")
         return updated_item
     except HTTPException:
         raise
@@ -140,12 +205,7 @@ async def update_portfolio(portfolio_id: str, item: PortfolioItem, db: AsyncIOMo
 @router.delete("/portfolio/{portfolio_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_portfolio(portfolio_id: str, db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
     try:
-        if not ObjectId.is_valid(portfolio_id):
-            raise HTTPException(status_code=400, detail="無效的作品 ID 格式")
-
-        result = await db.portfolio.delete_one({"_id": ObjectId(portfolio_id)})
-
-        if result.deleted_count == 0:
+        if not await portfolio_repository(db).delete(parse_object_id(portfolio_id, INVALID_PORTFOLIO_ID)):
             raise HTTPException(status_code=404, detail="找不到該作品")
         
         return # 204 No Content for successful deletion
@@ -0,0 +1,89 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List, Literal, Optional, Tuple
+from datetime import datetime
+from pydantic import BaseModel
+from motor.motor_asyncio import AsyncIOMotorClient
+import sys
+
+from services.db_service import get_database
+from services.http_cache import combined_validators, not_modified
+from services.response_cache import CachedResponse, cached_json_response
+from services.search_service import SEARCH_SOURCES, make_snippet, search
+
+router = APIRouter()
+
+SEARCH_COLLECTIONS = tuple(source.collection for source in SEARCH_SOURCES)
+
+
+class SearchResult(BaseModel):
+    id: str
+    type: str # "blog" or "portfolio"
+    title: str
+    subtitle: Optional[str] = None
+    snippet: str
+    highlights: List[Tuple[int, int]] = [] # [start, end) offsets of the matches in `snippet`
+    tags: List[str] = []
+    date: Optional[datetime] = None # published_at of a post, created_at of a portfolio item
+    score: float
+
+
+class SearchResponse(BaseModel):
+    query: str
+    total: int # Matches before `limit` is applied
+    results: List[SearchResult]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "query": "機器學習",
+                "total": 1,
+                "results": [{
+                    "id": "60a724b00f7e4f00150974e6",
+                    "type": "blog",
+                    "title": "機器學習入門",
+                    "subtitle": None,
+                    "snippet": "…這篇文章介紹機器學習的基本概念…",
+                    "highlights": [[7, 11]],
+                    "tags": ["AI"],
+                    "date": "2024-05-01T08:00:00",
+                    "score": 4.2,
+                }],
+            }
+        }
+
+
+@router.get("/search", response_model=SearchResponse, summary="Search Posts And Portfolio")
+async def search_content(
+    request: Request,
+    db: AsyncIOMotorClient = Depends(get_database),
+    q: str = Query(..., min_length=1, max_length=100),
+    type: Optional[Literal["blog", "portfolio"]] = Query(None),
+    limit: int = Query(20, ge=1, le=50),
+):
+    """
+    Full-text search over published posts and portfolio items: titles, subtitles,
+    descriptions, tags and the text of the HTML content. Every query term must match;
+    Chinese text is matched by character bigrams, so no word segmentation is needed.
+    """
+    try:
+        validators = await combined_validators(db, SEARCH_COLLECTIONS, "search", request.url.query)
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+
+        async def render() -> CachedResponse:
+            total, hits = await search(db, q, [type] if type else None, limit)
+            results = []
+            for hit in hits:
+                snippet, highlights = make_snippet(hit.entry.text, q)
+                results.append(SearchResult(
+                    id=hit.entry.id, type=hit.entry.kind, title=hit.entry.title, subtitle=hit.entry.subtitle,
+                    snippet=snippet, highlights=highlights, tags=hit.entry.tags, date=hit.entry.date,
+                    score=round(hit.score, 4),
+                ))
+            return CachedResponse(SearchResponse(query=q, total=total, results=results).model_dump_json().encode())
+
+        return await cached_json_response(request, validators, render)
+    except Exception as e:
+        print(f"Error searching content: {e}", file=sys.stderr)
+        raise HTTPException(status_code=500, detail="搜尋失敗")
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from typing import List, Optional
 from pydantic import BaseModel, Field
 from motor.motor_asyncio import AsyncIOMotorClient
-from bson import ObjectId # Import ObjectId for explicit conversion
 
+from models.batch import BatchRequest, BatchResult, ReorderRequest
 from models.objectid_model import PydanticObjectId # This is the Annotated type
 from services.db_service import get_database # Add this missing import
 from services.auth_service import get_current_admin_user # Add this missing import
+from services.repository import ORDER_FIELD, Repository, creation_order, parse_object_id
+from services.http_cache import collection_validators, not_modified
+from services.json_service import ListSerializer
+from services.response_cache import CachedResponse, cached_json_response
 
 router = APIRouter()
 
@@ -16,6 +20,7 @@ class SkillIn(BaseModel):
     icon: str # e.g., "faCode", "faServer". The frontend will map this to an icon.
     main: str # e.g., "前端開發"
     subSkills: List[str] = []
+    order: Optional[int] = None # Position in the list; new skills go last, PUT /skills/order rewrites it
 
     class Config:
         json_schema_extra = {
@@ -32,6 +37,7 @@ class SkillOut(BaseModel):
     icon: str
     main: str
     subSkills: List[str] = []
+    order: Optional[int] = None
 
     class Config:
         populate_by_name = True # Allows populating from alias (e.g., _id)
@@ -45,30 +51,74 @@ class SkillOut(BaseModel):
             }
         }
 
+_skill_list_serializer = ListSerializer(SkillOut)
+
+SKILL_SORT = [(ORDER_FIELD, 1), ("_id", 1)]
+
+
+def skill_repository(db) -> Repository[SkillOut]:
+    return Repository(db, "skills", SkillOut)
+
+
+async def fetch_skills(db) -> List[dict]:
+    """All skills in display order. Shared by GET /skills and the homepage bootstrap."""
+    return await skill_repository(db).find(sort=SKILL_SORT, limit=100)
+
+
+def new_skill_doc(skill_in: SkillIn) -> dict:
+    skill_dict = skill_in.model_dump() # Use model_dump() without alias for insertion
+    if skill_dict[ORDER_FIELD] is None:
+        skill_dict[ORDER_FIELD] = creation_order()
+    return skill_dict
+
 # --- API Endpoints for Skills ---
 
 @router.get("/skills", response_model=List[SkillOut], response_model_by_alias=False, tags=["Skills"]) # Use SkillOut for response
-async def get_all_skills(db: AsyncIOMotorClient = Depends(get_database)):
+async def get_all_skills(request: Request, db: AsyncIOMotorClient = Depends(get_database)):
     """
-    Fetch all skills from the database.
+    Fetch all skills from the database, in display order.
+    The serialized list is cached per collection version (see services/response_cache.py).
     """
-    skills_list = await db.skills.find().to_list(100)
-    # The response_model=List[SkillOut] will handle the conversion from _id to id
-    return skills_list
+    validators = await collection_validators(db, "skills", "list")
+    cached = not_modified(request, validators)
+    if cached:
+        return cached
+
+    async def render() -> CachedResponse:
+        skills_list = await fetch_skills(db)
+        # Serialized like response_model=List[SkillOut] would: _id becomes id
+        return CachedResponse(_skill_list_serializer.dump(skills_list))
+
+    return await cached_json_response(request, validators, render)
 
 @router.post("/skills", response_model=SkillOut, response_model_by_alias=False, status_code=status.HTTP_201_CREATED, tags=["Skills"]) # Use SkillOut for response
 async def create_skill(skill_in: SkillIn, db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
     """
     Create a new skill. (Admin Only)
     """
-    skill_dict = skill_in.model_dump() # Use model_dump() without alias for insertion
-    
-    result = await db.skills.insert_one(skill_dict)
-    
-    # Retrieve the created document to ensure _id is present for SkillOut
-    created_skill_doc = await db.skills.find_one({"_id": result.inserted_id})
+    # The repository returns the stored document, including its new _id, without reading it back
+    created_skill_doc = await skill_repository(db).insert(new_skill_doc(skill_in))
     return created_skill_doc # FastAPI will convert this document to SkillOut
 
+@router.post("/skills/batch", response_model=BatchResult[SkillOut], response_model_by_alias=False, tags=["Skills"])
+async def batch_skills(batch: BatchRequest[SkillIn], db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
+    """
+    Create, update and delete several skills in one request and one database round-trip. (Admin Only)
+    """
+    outcome = await skill_repository(db).bulk(
+        inserts=[new_skill_doc(skill_in) for skill_in in batch.create],
+        updates=[(item.id, {"$set": item.data.model_dump(exclude_unset=True)}) for item in batch.update],
+        deletes=batch.delete,
+    )
+    return {"created": outcome.inserted, "updated": outcome.matched, "deleted": outcome.deleted}
+
+@router.put("/skills/order", status_code=status.HTTP_204_NO_CONTENT, tags=["Skills"])
+async def reorder_skills(reorder: ReorderRequest, db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
+    """
+    Set the display order of the skills: `ids` from first to last. (Admin Only)
+    """
+    await skill_repository(db).reorder(reorder.ids)
+
 @router.put("/skills/{skill_id}", response_model=SkillOut, response_model_by_alias=False, tags=["Skills"]) # Use SkillOut for response
 async def update_skill(skill_id: str, skill_update: SkillIn, db: AsyncIOMotorClient = Depends(get_database), admin_user: dict = Depends(get_current_admin_user)):
     """
@@ -76,15 +126,10 @@ async def update_skill(skill_id: str, skill_update: SkillIn, db: AsyncIOMotorCli
     """
     update_data = skill_update.model_dump(exclude_unset=True) # Exclude unset fields from the update
 
-    result = await db.skills.update_one(
-        {"_id": ObjectId(skill_id)}, # Correct: Use ObjectId for path parameter conversion
-        {"$set": update_data}
-    )
+    updated_skill_doc = await skill_repository(db).set_fields(parse_object_id(skill_id), update_data)
 
-    if result.matched_count == 0:
+    if updated_skill_doc is None:
         raise HTTPException(status_code=404, detail=f"Skill with ID {skill_id} not found")
-    
-    updated_skill_doc = await db.skills.find_one({"_id": ObjectId(skill_id)}) # Correct: Use ObjectId here
     return updated_skill_doc # FastAPI will convert this document to SkillOut
 
 @router.delete("/skills/{skill_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Skills"])
@@ -92,9 +137,7 @@ async def delete_skill(skill_id: str, db: AsyncIOMotorClient = Depends(get_datab
     """
     Delete a skill by its ID. (Admin Only)
     """
-    result = await db.skills.delete_one({"_id": ObjectId(skill_id)}) # Correct: Use ObjectId here
-
-    if result.deleted_count == 0:
+    if not await skill_repository(db).delete(parse_object_id(skill_id)):
         raise HTTPException(status_code=404, detail=f"Skill with ID {skill_id} not found")
 
     return
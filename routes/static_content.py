@@ -1,26 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from models.hero_settings import HeroSettings
 from models.site_settings import SiteSettings
 from services.static_content_service import StaticContentService, get_static_content_service
 from services.auth_service import get_current_admin_user # For admin authentication
+from services.http_cache import collection_validators, not_modified
 
 router = APIRouter()
 
 @router.get("/settings/hero", response_model=HeroSettings, summary="Get Hero Section Settings")
 async def get_hero_section_settings(
+    request: Request,
     static_content_service: StaticContentService = Depends(get_static_content_service)
 ):
     """
     Retrieves the current settings for the Hero section.
     If settings do not exist, default settings will be created and returned.
     """
-    settings = await static_content_service.get_hero_settings()
-    if not settings:
+    validators = await collection_validators(static_content_service.database, "settings", "hero_settings")
+    cached = not_modified(request, validators)
+    if cached:
+        return cached
+
+    # Served from the in-process settings cache as pre-serialized JSON bytes
+    body = await static_content_service.get_hero_settings_json()
+    if not body:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Hero settings not found and could not be created."
         )
-    return settings
+    return Response(content=body, media_type="application/json", headers=validators.headers())
 
 @router.put("/settings/hero", response_model=HeroSettings, summary="Update Hero Section Settings")
 async def update_hero_section_settings(
@@ -48,15 +56,21 @@ async def update_hero_section_settings(
 
 @router.get("/settings/site", response_model=SiteSettings, summary="Get Site Settings")
 async def get_site_settings(
+    request: Request,
     static_content_service: StaticContentService = Depends(get_static_content_service)
 ):
-    settings = await static_content_service.get_site_settings()
-    if not settings:
+    validators = await collection_validators(static_content_service.database, "settings", "site_settings")
+    cached = not_modified(request, validators)
+    if cached:
+        return cached
+
+    body = await static_content_service.get_site_settings_json()
+    if not body:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Site settings not found and could not be created."
         )
-    return settings
+    return Response(content=body, media_type="application/json", headers=validators.headers())
 
 @router.put("/settings/site", response_model=SiteSettings, summary="Update Site Settings")
 async def update_site_settings(
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+from motor.motor_asyncio import AsyncIOMotorClient
+import sys
+
+from services.db_service import get_database
+from services.http_cache import collection_validators, not_modified
+from services.json_service import ListSerializer
+from services.response_cache import CachedResponse, cached_json_response
+from services.tag_service import TAG_COUNTS_COLLECTION, get_tag_counts
+
+router = APIRouter()
+
+
+class TagCount(BaseModel):
+    type: str = Field(alias="kind") # "blog" (published posts only) or "portfolio"
+    tag: str
+    count: int
+
+    class Config:
+        populate_by_name = True
+        json_schema_extra = {
+            "example": {"type": "blog", "tag": "Python", "count": 12}
+        }
+
+
+_tag_list_serializer = ListSerializer(TagCount)
+
+
+@router.get("/tags", response_model=List[TagCount], response_model_by_alias=False, summary="Tag Cloud")
+async def get_tags(
+    request: Request,
+    db: AsyncIOMotorClient = Depends(get_database),
+    type: Optional[Literal["blog", "portfolio"]] = Query(None),
+):
+    """
+    Tags in use with the number of published posts or portfolio items carrying them, most used first.
+    Read from the materialized counts in `tag_counts`; the content collections are not scanned.
+    """
+    try:
+        validators = await collection_validators(db, TAG_COUNTS_COLLECTION, "list", request.url.query)
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+
+        async def render() -> CachedResponse:
+            tags = await get_tag_counts(db, [type] if type else None)
+            return CachedResponse(_tag_list_serializer.dump(tags))
+
+        return await cached_json_response(request, validators, render)
+    except Exception as e:
+        print(f"Error fetching tags: {e}", file=sys.stderr)
+        raise HTTPException(status_code=500, detail="無法獲取標籤列表")
@@ -2,26 +2,307 @@ from flask import Blueprint, render_template, current_app, request
 from flask_socketio import emit
 import azure.cognitiveservices.speech as speechsdk
 import google.generativeai as genai
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import base64
+import itertools
 import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
 import uuid
 
 from app import socketio
+from services.audio_ingest import AudioIngest
 
 translator_bp = Blueprint('translator_bp', __name__)
 
 # In-memory session management
 user_sessions = {}
 
+# Translation (Gemini) and synthesis (Azure TTS) are network-bound, so one thread pool serves every session
+TRANSLATOR_WORKERS = int(os.getenv('TRANSLATOR_WORKERS', 8))
+# Sentences of one session that may be in translation/synthesis at once; recognition waits when it is reached
+TRANSLATOR_MAX_IN_FLIGHT = int(os.getenv('TRANSLATOR_MAX_IN_FLIGHT', 4))
+
+pipeline_pool = ThreadPoolExecutor(max_workers=TRANSLATOR_WORKERS, thread_name_prefix='translator')
+
+GEMINI_MODEL = 'gemini-2.5-flash-lite'
+LANG_NAMES = {'zh-TW': '繁體中文', 'en-US': '英文', 'ja-JP': '日文'}
+VOICE_MAP = {
+    'zh-TW': "zh-TW-HsiaoChenNeural",
+    'en-US': "en-US-JennyNeural",
+    'ja-JP': "ja-JP-NanamiNeural"
+}
+DEFAULT_VOICE = "en-US-JennyNeural"
+TTS_OUTPUT_FORMAT = speechsdk.SpeechSynthesisOutputFormat.Riff16Khz16BitMonoPcm
+# Streamed audio: MP3 can be appended chunk by chunk to a MediaSource in the browser
+TTS_STREAM_FORMAT = speechsdk.SpeechSynthesisOutputFormat.Audio24Khz48KBitRateMonoMp3
+TTS_STREAM_CHUNK_BYTES = 2400 # About 0.4 s of audio at 48 kbit/s
+
+# genai.configure is process-wide, so the model is built once and shared by every session
+_gemini_lock = threading.Lock()
+_gemini = None # (api_key, GenerativeModel)
+
+
+def get_gemini_model(api_key):
+    global _gemini
+    with _gemini_lock:
+        if _gemini is None or _gemini[0] != api_key:
+            genai.configure(api_key=api_key)
+            _gemini = (api_key, genai.GenerativeModel(GEMINI_MODEL))
+        return _gemini[1]
+
+
+class SynthesizerPool:
+    """
+    Idle SpeechSynthesizers per (key, region, voice, output format), shared by every session.
+    A synthesizer keeps its connection to the service open between sentences but runs one
+    synthesis at a time, so each worker borrows one and gives it back.
+    """
+    def __init__(self, max_idle):
+        self.max_idle = max_idle
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _create(self, key):
+        speech_key, speech_region, voice, output_format = key
+        speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
+        speech_config.speech_synthesis_voice_name = voice
+        speech_config.set_speech_synthesis_output_format(output_format)
+        return speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+
+    @contextmanager
+    def borrow(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            synthesizer = idle.pop() if idle else None
+        if synthesizer is None:
+            synthesizer = self._create(key)
+        # A synthesizer that raised is dropped rather than handed to the next sentence
+        yield synthesizer
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(synthesizer)
+
+    def warm(self, key):
+        with self.borrow(key) as synthesizer:
+            # Does the DNS lookup, TLS handshake and authentication now instead of on the first sentence
+            speechsdk.Connection.from_speech_synthesizer(synthesizer).open(True)
+
+
+synthesizer_pool = SynthesizerPool(max_idle=TRANSLATOR_WORKERS)
+
+# Translation memory: translations and synthesized audio of phrases already seen ("thank you", greetings...)
+TRANSLATION_MEMORY_MB = float(os.getenv('TRANSLATION_MEMORY_MB', 64))
+# Optional second level, shared by restarts and processes; empty disables it
+TRANSLATION_CACHE_PATH = os.getenv('TRANSLATION_CACHE_PATH', '')
+TRANSLATION_CACHE_MB = float(os.getenv('TRANSLATION_CACHE_MB', 512))
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_phrase(text):
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFKC', text)).strip()
+
+
+def translation_key(source_lang, target_lang, text):
+    # Case is folded on the source side only: "Thank you" and "thank you" share one translation
+    return f"t\x1f{source_lang}\x1f{target_lang}\x1f{normalize_phrase(text).casefold()}"
+
+
+def audio_key(voice, output_format, text):
+    return f"a\x1f{voice}\x1f{output_format}\x1f{normalize_phrase(text)}"
+
+
+def _value_size(value):
+    return len(value) if isinstance(value, bytes) else len(value.encode('utf-8'))
+
+
+class DiskCache:
+    """
+    sqlite store of the translation memory. When it grows past max_bytes, the least recently
+    used entries are deleted until it is back under 90% of it.
+    """
+    def __init__(self, path, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS entries '
+            '(key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+        self._size = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE entries SET accessed = ? WHERE key = ?', (time.time(), key))
+            return row[0]
+
+    def put(self, key, value):
+        size = _value_size(value)
+        with self._lock:
+            old = self._db.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)',
+                (key, value, size, time.time())
+            )
+            self._size += size - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+
+    def _evict(self, target):
+        rows = self._db.execute('SELECT key, size FROM entries ORDER BY accessed').fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self._db.executemany('DELETE FROM entries WHERE key = ?', evicted)
+
+
+class TranslationMemory:
+    """
+    Two-level cache: an in-memory LRU bounded by the size of its values, in front of an optional
+    DiskCache. A disk hit is copied into memory, so repeated phrases are served without any I/O.
+    """
+    def __init__(self, max_bytes, disk=None):
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        value = self.disk.get(key) if self.disk else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.disk:
+            try:
+                self.disk.put(key, value)
+            except sqlite3.Error as e:
+                print(f"Could not write translation cache: {e}")
+
+    def _remember(self, key, value):
+        size = _value_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= _value_size(old)
+            self._entries[key] = value
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= _value_size(evicted)
+
+    def stats(self):
+        """Process-wide counters since startup; a memory or disk hit both count as hits."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._size,
+            }
+
+
+def _open_disk_cache():
+    if not TRANSLATION_CACHE_PATH:
+        return None
+    try:
+        return DiskCache(TRANSLATION_CACHE_PATH, int(TRANSLATION_CACHE_MB * 1024 * 1024))
+    except sqlite3.Error as e:
+        # The in-memory level still works without it
+        print(f"Could not open translation cache at {TRANSLATION_CACHE_PATH}: {e}")
+        return None
+
+
+translation_memory = TranslationMemory(int(TRANSLATION_MEMORY_MB * 1024 * 1024), _open_disk_cache())
+
+
+class OrderedEmitter:
+    """
+    Emits the events of each sentence in recognition order, whatever order the sentences finish in.
+    Events of the oldest unfinished sentence go out immediately (so its audio can be streamed);
+    those of later sentences are held until every sentence before them has called finish().
+    """
+    def __init__(self, room):
+        self.room = room
+        self._next_seq = 0
+        self._pending = {} # seq -> [held events, finished]
+        self._lock = threading.Lock()
+
+    def emit(self, seq, event, payload):
+        with self._lock:
+            if seq == self._next_seq:
+                socketio.emit(event, payload, room=self.room)
+            else:
+                self._pending.setdefault(seq, [[], False])[0].append((event, payload))
+
+    def finish(self, seq):
+        with self._lock:
+            self._pending.setdefault(seq, [[], False])[1] = True
+            while self._pending.get(self._next_seq, (None, False))[1]:
+                del self._pending[self._next_seq]
+                self._next_seq += 1
+                held = self._pending.get(self._next_seq)
+                if held:
+                    for event, payload in held[0]:
+                        socketio.emit(event, payload, room=self.room)
+                    held[0].clear()
+
 class TranslationSession:
-    def __init__(self, source_lang, target_lang, sample_rate, sid, app):
+    def __init__(self, source_lang, target_lang, sample_rate, sid, app, stream_audio=False):
         self.sid = sid
         self.source_lang = source_lang
         self.target_lang = target_lang
         self.app = app
+        self.active = True
+        self.voice = VOICE_MAP.get(target_lang, DEFAULT_VOICE)
+        # Streamed sessions get binary MP3 chunks (translation_audio_chunk) instead of one base64 WAV
+        self.stream_audio = stream_audio
+        self.tts_format = TTS_STREAM_FORMAT if stream_audio else TTS_OUTPUT_FORMAT
 
-        # Use the sample rate provided by the client for higher accuracy.
-        audio_format = speechsdk.audio.AudioStreamFormat(samples_per_second=sample_rate, bits_per_sample=16, channels=1)
+        # Pipeline state: the recognizer callback only hands sentences over, the pool does the rest
+        self._seq = itertools.count()
+        self._in_flight = threading.BoundedSemaphore(TRANSLATOR_MAX_IN_FLIGHT)
+        # translated_sentence carries the sentence id, so it goes out as soon as it is ready;
+        # audio is played on arrival, so it must keep the order of the sentences
+        self._audio = OrderedEmitter(sid)
+
+        # Client audio is resampled from the sample rate it reports and silence-gated before Azure sees it
+        self.ingest = AudioIngest(sample_rate)
+        audio_format = speechsdk.audio.AudioStreamFormat(samples_per_second=self.ingest.output_rate, bits_per_sample=16, channels=1)
         self.push_stream = speechsdk.audio.PushAudioInputStream(stream_format=audio_format)
 
         # --- Azure Speech-to-Text (STT) Setup ---
@@ -47,13 +328,29 @@ class TranslationSession:
     def start(self):
         self.speech_recognizer.start_continuous_recognition()
         print(f"[{self.sid}] Continuous recognition started.")
+        # Connect to Gemini and Azure TTS while the user is still speaking the first sentence
+        pipeline_pool.submit(self.warm_up)
+
+    def warm_up(self):
+        with self.app.app_context():
+            try:
+                synthesizer_pool.warm(self.synthesizer_key())
+                get_gemini_model(current_app.config['GEMINI_API_KEY']).count_tokens("warm up")
+                print(f"[{self.sid}] Translation clients warmed up.")
+            except Exception as e:
+                # Not fatal: the first sentence just pays the connection setup itself
+                print(f"[{self.sid}] Could not warm up translation clients: {e}")
 
     def stop(self):
+        self.active = False
         if self.speech_recognizer:
             self.speech_recognizer.stop_continuous_recognition()
         if self.push_stream:
             self.push_stream.close()
-        print(f"[{self.sid}] Continuous recognition stopped.")
+        print(
+            f"[{self.sid}] Continuous recognition stopped. Audio ingest: {self.ingest.stats()}. "
+            f"Translation memory: {translation_memory.stats()}"
+        )
 
     def on_recognizing(self, evt):
         # This function is also called in a background thread.
@@ -77,7 +374,8 @@ class TranslationSession:
                 
                 # Emit event with ID for the current frontend
                 socketio.emit('recognized_sentence', {'id': sentence_id, 'text': full_sentence}, room=self.sid)
-                self.translate_and_synthesize(full_sentence, sentence_id)
+                # Returns right away, so the next sentence's recognition events are not held up
+                self.submit_sentence(full_sentence, sentence_id)
                 
             elif evt.result.reason == speechsdk.ResultReason.NoMatch:
                 print(f"[{self.sid}] NOMATCH: Speech could not be recognized.")
@@ -92,59 +390,137 @@ class TranslationSession:
             print(f"[{self.sid}] Error details: {evt.error_details}")
         self.stop()
 
-    def translate_and_synthesize(self, text_to_translate, sentence_id):
-        with self.app.app_context():
-            try:
+    def submit_sentence(self, text_to_translate, sentence_id):
+        """
+        Queues a recognized sentence for translation and synthesis. Up to TRANSLATOR_MAX_IN_FLIGHT
+        sentences are processed concurrently; past that, this blocks the recognizer thread, which
+        applies backpressure instead of growing the backlog without bound.
+        """
+        seq = next(self._seq)
+        self._in_flight.acquire()
+        pipeline_pool.submit(self._translate_stage, seq, text_to_translate, sentence_id)
+
+    def _translate_stage(self, seq, text_to_translate, sentence_id):
+        # Every path ends in _finish(seq), here or in the synthesis stage: a sentence that is never
+        # finished would keep its in-flight slot and hold back the audio of all later sentences
+        handed_off = False
+        try:
+            with self.app.app_context():
                 # 1. Translate Text with Gemini
-                print(f"[{self.sid}] Sending to Gemini for translation: '{text_to_translate}'")
-                translated = self.translate_text_with_gemini(text_to_translate)
-                print(f"[{self.sid}] Received from Gemini: '{translated}'")
-                
+                key = translation_key(self.source_lang, self.target_lang, text_to_translate)
+                translated = translation_memory.get(key)
+                if translated is not None:
+                    print(f"[{self.sid}] Translation memory hit: '{translated}'")
+                else:
+                    print(f"[{self.sid}] Sending to Gemini for translation: '{text_to_translate}'")
+                    translated = self.translate_text_with_gemini(text_to_translate)
+                    print(f"[{self.sid}] Received from Gemini: '{translated}'")
+                    if translated:
+                        translation_memory.put(key, translated)
+
+                if not self.active:
+                    return
                 # Emit event with ID for the current frontend
                 socketio.emit('translated_sentence', {'id': sentence_id, 'text': translated}, room=self.sid)
                 print(f"[{self.sid}] Emitted 'translated_sentence' to frontend.")
 
+                # Synthesis is a separate task, so this worker is free for the next sentence's translation
+                pipeline_pool.submit(self._synthesize_stage, seq, translated, sentence_id)
+                handed_off = True
+        except Exception as e:
+            print(f"[{self.sid}] Error in translation: {e}")
+            socketio.emit('translation_error', {'error': str(e)}, room=self.sid)
+        finally:
+            if not handed_off:
+                self._finish(seq)
+
+    def _synthesize_stage(self, seq, translated, sentence_id):
+        event, payload = None, None
+        try:
+            with self.app.app_context():
                 # 2. Synthesize Speech with Azure
                 print(f"[{self.sid}] Sending to Azure for synthesis: '{translated}'")
-                audio_base64 = self.text_to_speech(translated)
-                if audio_base64:
-                    socketio.emit('translation_audio', {'audio': audio_base64}, room=self.sid)
-                    print(f"[{self.sid}] Emitted 'translation_audio' to frontend.")
+                if self.stream_audio:
+                    if not self.stream_speech(seq, sentence_id, translated):
+                        print(f"[{self.sid}] Azure synthesis returned no audio.")
                 else:
-                    print(f"[{self.sid}] Azure synthesis returned no audio.")
+                    audio_base64 = self.text_to_speech(translated)
+                    if audio_base64:
+                        event, payload = 'translation_audio', {'id': sentence_id, 'audio': audio_base64}
+                    else:
+                        print(f"[{self.sid}] Azure synthesis returned no audio.")
+        except Exception as e:
+            print(f"[{self.sid}] Error in synthesis: {e}")
+            socketio.emit('translation_error', {'error': str(e)}, room=self.sid)
+        finally:
+            if self.stream_audio:
+                # Also sent after a failure, so the client knows no more chunks of this sentence are coming
+                event, payload = 'translation_audio_end', {'id': sentence_id}
+            self._finish(seq, event, payload)
 
-            except Exception as e:
-                print(f"[{self.sid}] Error in translation/synthesis: {e}")
-                socketio.emit('translation_error', {'error': str(e)}, room=self.sid)
+    def _finish(self, seq, event=None, payload=None):
+        try:
+            if self.active:
+                if event:
+                    self._audio.emit(seq, event, payload)
+                self._audio.finish(seq)
+        finally:
+            self._in_flight.release()
+
+    def synthesizer_key(self):
+        config = self.app.config
+        return (config['AZURE_SPEECH_KEY'], config['AZURE_SPEECH_REGION'], self.voice, self.tts_format)
 
     def translate_text_with_gemini(self, text):
-        api_key = current_app.config['GEMINI_API_KEY']
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash-lite')
-        lang_map = {'zh-TW': '繁體中文', 'en-US': '英文', 'ja-JP': '日文'}
-        prompt = f"請將以下內容從「{lang_map.get(self.source_lang, self.source_lang)}」翻譯成「{lang_map.get(self.target_lang, self.target_lang)}」，請只回傳翻譯後的結果，不要包含任何額外的說明或文字.\n\n原文:\n{text}"
+        model = get_gemini_model(current_app.config['GEMINI_API_KEY'])
+        prompt = f"請將以下內容從「{LANG_NAMES.get(self.source_lang, self.source_lang)}」翻譯成「{LANG_NAMES.get(self.target_lang, self.target_lang)}」，請只回傳翻譯後的結果，不要包含任何額外的說明或文字.\n\n原文:\n{text}"
         response = model.generate_content(prompt)
         return response.text.strip()
 
     def text_to_speech(self, text):
-        speech_key = current_app.config['AZURE_SPEECH_KEY']
-        speech_region = current_app.config['AZURE_SPEECH_REGION']
-        speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
-        
-        voice_map = {
-            'zh-TW': "zh-TW-HsiaoChenNeural",
-            'en-US': "en-US-JennyNeural",
-            'ja-JP': "ja-JP-NanamiNeural"
-        }
-        speech_config.speech_synthesis_voice_name = voice_map.get(self.target_lang, "en-US-JennyNeural")
-        speech_config.set_speech_synthesis_output_format(speechsdk.SpeechSynthesisOutputFormat.Riff16Khz16BitMonoPcm)
-
-        speech_synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
-        result = speech_synthesizer.speak_text_async(text).get()
-
-        if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-            return base64.b64encode(result.audio_data).decode('utf-8')
-        return None
+        key = audio_key(self.voice, self.tts_format, text)
+        audio_data = translation_memory.get(key)
+        if audio_data is None:
+            with synthesizer_pool.borrow(self.synthesizer_key()) as speech_synthesizer:
+                result = speech_synthesizer.speak_text_async(text).get()
+            if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+                return None
+            audio_data = result.audio_data
+            translation_memory.put(key, audio_data)
+        return base64.b64encode(audio_data).decode('utf-8')
+
+    def stream_speech(self, seq, sentence_id, text):
+        """
+        Sends the MP3 audio of a sentence as binary translation_audio_chunk events while Azure is
+        still synthesizing it, instead of waiting for the whole utterance. Returns False if no audio was produced.
+        """
+        key = audio_key(self.voice, self.tts_format, text)
+        audio_data = translation_memory.get(key)
+        if audio_data is not None:
+            self._audio.emit(seq, 'translation_audio_chunk', {'id': sentence_id, 'chunk': audio_data})
+            return True
+
+        chunks = []
+        with synthesizer_pool.borrow(self.synthesizer_key()) as speech_synthesizer:
+            # Returns as soon as the first audio arrives
+            result = speech_synthesizer.start_speaking_text_async(text).get()
+            if result.reason == speechsdk.ResultReason.Canceled:
+                return False
+            stream = speechsdk.AudioDataStream(result)
+            buffer = bytes(TTS_STREAM_CHUNK_BYTES)
+            filled = stream.read_data(buffer)
+            while filled > 0:
+                chunk = buffer[:filled]
+                chunks.append(chunk)
+                if self.active:
+                    self._audio.emit(seq, 'translation_audio_chunk', {'id': sentence_id, 'chunk': chunk})
+                filled = stream.read_data(buffer)
+            completed = stream.status == speechsdk.StreamStatus.AllData
+
+        if completed:
+            # Only complete utterances are cached; a cut-off one would be replayed cut off
+            translation_memory.put(key, b''.join(chunks))
+        return bool(chunks)
 
 @translator_bp.route('/translator')
 def translator():
@@ -172,8 +548,10 @@ def handle_start_translation(data):
     target_lang = data.get('target_lang', 'ja-JP')
     # Get sample_rate from client, default to 48000 for safety.
     sample_rate = data.get('sample_rate', 48000)
+    # Opt-in: clients that can play MP3 from a MediaSource get the audio streamed as binary chunks
+    stream_audio = bool(data.get('stream_audio', False))
     
-    session = TranslationSession(source_lang, target_lang, sample_rate, sid, current_app._get_current_object())
+    session = TranslationSession(source_lang, target_lang, sample_rate, sid, current_app._get_current_object(), stream_audio)
     user_sessions[sid] = session
     session.start()
 
@@ -190,4 +568,7 @@ def handle_audio_stream(audio_chunk):
     sid = request.sid
     if sid in user_sessions:
         if audio_chunk:
-            user_sessions[sid].push_stream.write(audio_chunk)
\ No newline at end of file
+            session = user_sessions[sid]
+            data = session.ingest.process(audio_chunk)
+            if data:
+                session.push_stream.write(data)
\ No newline at end of file
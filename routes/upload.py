@@ -1,39 +1,177 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from services.auth_service import get_current_admin_user
+from services.db_service import get_database
+from services.image_service import MEDIA_COLLECTION, UPLOAD_DIR, enqueue_derivatives # UPLOAD_DIR: where files are saved
+from typing import Optional
 import aiofiles
+import hashlib
 import os
+import sys
 from uuid import uuid4
 
 router = APIRouter()
 
-# Define the directory where files will be saved
-UPLOAD_DIR = "static/uploads"
+# Partial uploads live inside UPLOAD_DIR so the final rename stays on the same filesystem (and Docker volume)
+UPLOAD_TMP_DIR = os.path.join(UPLOAD_DIR, ".tmp")
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 10 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Allowance for multipart boundaries and part headers when comparing against the request size
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+UPLOAD_TOO_LARGE_DETAIL = f"File too large. Maximum size is {UPLOAD_MAX_BYTES} bytes."
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Returns the file extension for the image type given by the magic bytes, or None if unsupported."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return ".gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    if head[4:12] in (b"ftypavif", b"ftypavis"):
+        return ".avif"
+    return None
+
+
+class UploadTooLarge(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=UPLOAD_TOO_LARGE_DETAIL)
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Pure ASGI middleware for POST .../upload: refuses the request from its Content-Length header
+    before the body is read, and counts the body as it arrives, so a chunked request without
+    Content-Length is cut off at the same size instead of being spooled to disk in full by the
+    multipart parser.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].endswith("/upload"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD_BYTES
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def counting_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # An HTTPException, so the route layer answers it with a 413 rather than a parse error
+                    raise UploadTooLarge()
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, tracking_send)
+        except UploadTooLarge:
+            # Raised outside the routes' exception handling (e.g. while a middleware read the body)
+            if response_started:
+                raise
+            await self._reject(scope, receive, tracking_send)
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, content={"detail": UPLOAD_TOO_LARGE_DETAIL})
+        await response(scope, receive, send)
+
 
 @router.post("/upload", dependencies=[Depends(get_current_admin_user)])
-async def upload_image(file: UploadFile = File(...)):
+async def upload_image(file: UploadFile = File(...), db = Depends(get_database)):
     """
     Handles image uploads from the admin panel.
     - Ensures the user is an authenticated admin.
-    - Generates a unique filename to prevent overwrites.
-    - Saves the file to the UPLOAD_DIR.
+    - The request body is capped by UploadSizeLimitMiddleware while it arrives; the multipart
+      parser has already spooled the file (in memory, or on disk past 1 MB) by the time this runs.
+    - Copies the spooled file to a temp file in fixed-size chunks, enforcing UPLOAD_MAX_BYTES.
+    - Checks the magic bytes of the first chunk; the extension comes from the detected type.
+    - Names the file by the SHA-256 of its content, computed while streaming, so
+      re-uploading the same image resolves to the existing file.
+    - Atomically renames the temp file into UPLOAD_DIR.
+    - On a re-upload, refreshes the stored file's mtime so the orphan sweep (scripts/gc_uploads.py)
+      treats it as new again, and queues its variants if it has no media record yet.
+    - Queues WebP variants at fixed widths for new files (see services/image_service.py).
     - Returns the relative path to the saved file.
     """
-    # Ensure the upload directory exists
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    # Ensure the upload directories exist
+    os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
 
-    # Generate a unique filename using UUID and keeping the original extension
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid4()}{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
+    temp_path = os.path.join(UPLOAD_TMP_DIR, f"{uuid4().hex}.part")
+    file_extension = None
+    size = 0
+    digest = hashlib.sha256()
+    is_duplicate = False
 
     try:
-        # Asynchronously write the file to the server's disk
-        async with aiofiles.open(file_path, 'wb') as out_file:
-            content = await file.read()  # Read file content
-            await out_file.write(content)  # Write content to file
+        # Copy the spooled upload to the server's disk, one chunk at a time
+        async with aiofiles.open(temp_path, 'wb') as out_file:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                if file_extension is None:
+                    file_extension = sniff_image_type(chunk)
+                    if file_extension is None:
+                        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Only JPEG, PNG, GIF, WebP and AVIF images are allowed.")
+                size += len(chunk)
+                if size > UPLOAD_MAX_BYTES:
+                    raise UploadTooLarge()
+                digest.update(chunk)
+                await out_file.write(chunk)
+
+        if file_extension is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The uploaded file is empty.")
+
+        unique_filename = f"{digest.hexdigest()}{file_extension}"
+        file_path = os.path.join(UPLOAD_DIR, unique_filename)
+        if os.path.exists(file_path):
+            # Same bytes already stored; the temp file is removed below. Orphans are swept by
+            # mtime, so an old unreferenced copy must look new again until its form is saved.
+            try:
+                os.utime(file_path)
+                is_duplicate = True
+            except FileNotFoundError:
+                pass # Swept just now: store this copy instead
+        if not is_duplicate:
+            os.replace(temp_path, file_path)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"There was an error uploading the file: {e}")
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    needs_derivatives = not is_duplicate
+    if is_duplicate:
+        try:
+            needs_derivatives = await db[MEDIA_COLLECTION].find_one({"_id": unique_filename}, {"_id": 1}) is None
+        except Exception as e:
+            # Regenerating is idempotent, so queue them rather than risk a file without variants
+            print(f"Error looking up media record for {unique_filename}: {e}", file=sys.stderr)
+            needs_derivatives = True
+    if needs_derivatives:
+        enqueue_derivatives(db, unique_filename)
 
     # Return the relative path that the frontend can use
     relative_path = f"/{file_path.replace(os.path.sep, '/')}"
-    return {"file_path": relative_path}
+    return {"file_path": relative_path, "variants_path": f"/api/media/{unique_filename}/variants", "deduplicated": is_duplicate}
@@ -1,26 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Optional, Any
+from typing import Optional
 from bson.objectid import ObjectId
 from datetime import datetime, timedelta
 from pydantic import BaseModel, Field, EmailStr
-from typing_extensions import Annotated
 from motor.motor_asyncio import AsyncIOMotorClient
 import secrets
-from pydantic.functional_validators import BeforeValidator
 from services.db_service import get_database # Corrected import for the dependency
 
 router = APIRouter()
 
-# Pydantic V2 compatible ObjectId handling
-def validate_object_id(v: Any) -> ObjectId:
-    if isinstance(v, ObjectId):
-        return v
-    if isinstance(v, str) and ObjectId.is_valid(v):
-        return ObjectId(v)
-    raise ValueError("Invalid ObjectId")
-
-PydanticObjectId = Annotated[ObjectId, BeforeValidator(validate_object_id)]
-
 # Pydantic models for user (stubs for now)
 class UserRegisterRequest(BaseModel):
     email: EmailStr
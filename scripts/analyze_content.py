@@ -0,0 +1,60 @@
+import os
+import sys
+import asyncio
+import argparse
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+# Add project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.cache_service import bump_collection_version
+from services.content_service import analyze_content
+
+CONTENT_COLLECTIONS = ("blog_posts", "portfolio")
+
+
+async def main(reanalyze_all: bool):
+    """
+    Backfills sanitized content, excerpt, word count, reading time and TOC for documents
+    written before they were computed on save. With --all, every document is redone,
+    e.g. after changing the sanitizer's allowlist.
+    """
+    dotenv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+    if os.path.exists(dotenv_path):
+        load_dotenv(dotenv_path=dotenv_path)
+
+    mongo_uri = os.getenv('MONGODB_URI')
+    if not mongo_uri:
+        print("🔴 Error: MONGODB_URI environment variable not set.", file=sys.stderr)
+        sys.exit(1)
+
+    client = None
+    try:
+        client = AsyncIOMotorClient(mongo_uri)
+        db = client.get_database()
+        print(f"✅ Connected to database '{db.name}'.")
+
+        query = {"content": {"$type": "string"}}
+        if not reanalyze_all:
+            query["word_count"] = {"$exists": False}
+
+        for collection in CONTENT_COLLECTIONS:
+            requests = []
+            async for doc in db[collection].find(query, {"content": 1}):
+                requests.append(UpdateOne({"_id": doc["_id"]}, {"$set": analyze_content(doc["content"])}))
+            if requests:
+                await db[collection].bulk_write(requests, ordered=False)
+                await bump_collection_version(db, collection)
+            print(f"🔄 {collection}: analyzed {len(requests)} documents.")
+    finally:
+        if client:
+            client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the fields derived from post and portfolio content.")
+    parser.add_argument("--all", action="store_true", help="Re-analyze every document, not only those missing the fields.")
+    args = parser.parse_args()
+    asyncio.run(main(args.all))
@@ -0,0 +1,55 @@
+import os
+import sys
+import asyncio
+import argparse
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+# Add project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.index_service import INDEX_REGISTRY, apply_indexes, verify_indexes
+
+
+async def main(verify_only: bool):
+    """
+    Applies the index registry from services/index_service.py to the database,
+    or with --verify only reports indexes that are missing or out of date.
+    """
+    dotenv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+    if os.path.exists(dotenv_path):
+        load_dotenv(dotenv_path=dotenv_path)
+
+    mongo_uri = os.getenv('MONGODB_URI')
+    if not mongo_uri:
+        print("🔴 Error: MONGODB_URI environment variable not set.", file=sys.stderr)
+        sys.exit(1)
+
+    client = None
+    try:
+        client = AsyncIOMotorClient(mongo_uri)
+        db = client.get_database()
+        print(f"✅ Connected to database '{db.name}'.")
+
+        if not verify_only:
+            created = await apply_indexes(db)
+            print(f"🔄 Ensured {len(created)} indexes across {len(INDEX_REGISTRY)} collections.")
+
+        problems = await verify_indexes(db)
+        if problems:
+            print("\n🟡 Index problems:")
+            for collection, issues in problems.items():
+                for issue in issues:
+                    print(f"   {collection}.{issue}")
+            sys.exit(1)
+        print("✅ All registered indexes are present.")
+    finally:
+        if client:
+            client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply or verify the MongoDB index registry.")
+    parser.add_argument("--verify", action="store_true", help="Only check the indexes, do not create them.")
+    args = parser.parse_args()
+    asyncio.run(main(args.verify))
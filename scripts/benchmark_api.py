@@ -0,0 +1,340 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import struct
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+import httpx
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+# Add project root to the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from models.user import UserModel
+from services.cache_service import bump_collection_version
+
+BENCH_ADMIN_EMAIL = "bench-admin@example.com"
+BENCH_ADMIN_PASSWORD = "bench-password"
+
+SCENARIOS = ("blog", "portfolio", "settings", "login", "upload")
+
+# A scenario is slower than the baseline when its p95 or RPS is worse by more than this fraction
+REGRESSION_THRESHOLD = 0.10
+
+
+def make_html(size: int, seed: int) -> str:
+    paragraph = f"<p>第 {seed} 段內容 — lorem ipsum dolor sit amet, <strong>consectetur</strong> adipiscing elit.</p>\n"
+    return (paragraph * (size // len(paragraph.encode()) + 1))[: size // 2] # CJK text is ~2 bytes/char on average
+
+
+async def seed_database(db, posts: int, portfolio: int, content_bytes: int) -> None:
+    """Replaces blog_posts and portfolio with synthetic documents and creates the benchmark admin."""
+    now = datetime.utcnow()
+    await db.blog_posts.delete_many({})
+    await db.portfolio.delete_many({})
+
+    batch = []
+    for i in range(posts):
+        published = i % 10 != 0 # Every tenth post is a draft
+        batch.append({
+            "_id": ObjectId(),
+            "title": f"Benchmark post {i}",
+            "subtitle": "Seeded by scripts/benchmark_api.py",
+            "content": make_html(content_bytes, i),
+            "tags": [f"tag{i % 12}", "bench"],
+            "is_published": published,
+            "created_at": now - timedelta(hours=i),
+            "published_at": now - timedelta(hours=i) if published else None,
+        })
+        if len(batch) == 1000:
+            await db.blog_posts.insert_many(batch)
+            batch = []
+    if batch:
+        await db.blog_posts.insert_many(batch)
+
+    await db.portfolio.insert_many([
+        {
+            "title": f"Benchmark project {i}",
+            "description": "Seeded by scripts/benchmark_api.py",
+            "content": make_html(content_bytes, i),
+            "image_url": "/static/uploads/placeholder.jpg",
+            "tags": ["Python", "FastAPI", "MongoDB"],
+            "created_at": now - timedelta(days=i),
+        }
+        for i in range(portfolio)
+    ])
+
+    user_model = UserModel(db)
+    if not await user_model.find_by_email(BENCH_ADMIN_EMAIL):
+        await user_model.create_user(BENCH_ADMIN_EMAIL, BENCH_ADMIN_PASSWORD, "bench")
+
+    # Running servers must not keep serving cached responses of the previous data
+    for collection in ("blog_posts", "portfolio", "users"):
+        await bump_collection_version(db, collection)
+    print(f"✅ Seeded {posts} blog posts and {portfolio} portfolio items (~{content_bytes // 1024} KB HTML each).")
+
+
+def make_png(width: int = 64, height: int = 64) -> bytes:
+    """A small solid-colour RGB PNG, built with the stdlib so the benchmark does not need Pillow."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(b"\x00" + b"\x3c\x78\xb4" * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+UPLOAD_PNG = make_png()
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def rss_megabytes(pid: Optional[int]) -> Optional[float]:
+    """Current RSS of the server process (Linux /proc), or peak RSS of this process when running in-process."""
+    if pid is None:
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _patch_mongomock() -> None:
+    """mongomock has no $substrCP (used by the blog list); $substr is equivalent for what the stand-in stores."""
+    import mongomock.aggregate as aggregate
+
+    handle_string_operator = aggregate._Parser._handle_string_operator
+
+    def patched(self, operator, values):
+        return handle_string_operator(self, "$substr" if operator == "$substrCP" else operator, values)
+
+    aggregate._Parser._handle_string_operator = patched
+
+
+async def cleanup_uploads(db, uploaded: Set[str]) -> None:
+    """Removes the files this run uploaded in-process, once their variants are done."""
+    from services.image_service import _background_jobs
+    from services.storage_service import remove_upload
+
+    if _background_jobs:
+        await asyncio.gather(*list(_background_jobs), return_exceptions=True)
+    for filename in uploaded:
+        await remove_upload(db, filename)
+
+
+async def get_token(client: httpx.AsyncClient) -> str:
+    response = await client.post("/api/admin/token", data={"username": BENCH_ADMIN_EMAIL, "password": BENCH_ADMIN_PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def build_request(scenario: str, token: Optional[str], sequence: int, unique_uploads: bool) -> dict:
+    if scenario == "blog":
+        return {"method": "GET", "url": "/api/blog", "params": {"limit": 20}}
+    if scenario == "portfolio":
+        return {"method": "GET", "url": "/api/portfolio"}
+    if scenario == "settings":
+        return {"method": "GET", "url": "/api/settings/site"}
+    if scenario == "login":
+        return {"method": "POST", "url": "/api/admin/token", "data": {"username": BENCH_ADMIN_EMAIL, "password": BENCH_ADMIN_PASSWORD}}
+    if scenario == "upload":
+        # Trailing bytes after IEND make each file distinct, exercising the full write path instead of dedup
+        body = UPLOAD_PNG + (f"{time.time_ns()}-{sequence}".encode() if unique_uploads else b"")
+        return {
+            "method": "POST",
+            "url": "/api/upload",
+            "files": {"file": ("bench.png", body, "image/png")},
+            "headers": {"Authorization": f"Bearer {token}"},
+        }
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: str, concurrency: int, total: int, token: Optional[str], unique_uploads: bool, uploaded: Set[str]) -> dict:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    counter = iter(range(total))
+
+    async def worker():
+        for sequence in counter:
+            request = build_request(scenario, token, sequence, unique_uploads)
+            started = time.perf_counter()
+            try:
+                response = await client.request(**request)
+                status = response.status_code
+                if scenario == "upload" and status == 200:
+                    uploaded.add(os.path.basename(response.json()["file_path"]))
+            except httpx.HTTPError:
+                status = 0
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not 200 <= status < 300)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def compare(results: List[dict], baseline_path: str) -> int:
+    """Prints the change against a previous --output file; returns the number of regressions."""
+    with open(baseline_path) as f:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"\nAgainst {baseline_path}:")
+    for result in results:
+        before = baseline.get((result["scenario"], result["concurrency"]))
+        if not before:
+            continue
+        rps_change = (result["rps"] - before["rps"]) / before["rps"] if before["rps"] else 0.0
+        p95_change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        regressed = rps_change < -REGRESSION_THRESHOLD or p95_change > REGRESSION_THRESHOLD
+        regressions += regressed
+        marker = "🔴 REGRESSION" if regressed else ""
+        print(f"  {result['scenario']:<10} c={result['concurrency']:<4} RPS {rps_change:+7.1%}   p95 {p95_change:+7.1%}  {marker}")
+    return regressions
+
+
+async def main(args):
+    """
+    Seeds a benchmark database (optional) and drives the public and admin endpoints at the
+    given concurrency levels, reporting RPS, p50/p95/p99 latency and RSS per scenario.
+
+    Modes:
+    - default: requests go to a running server at --base-url (start it against a local mongod);
+      pass --server-pid to sample the server's RSS.
+    - --in-process: the app runs inside this process on an in-memory Mongo stand-in
+      (mongomock-motor), so no server or mongod is needed. Numbers are only comparable
+      with other in-process runs.
+    """
+    dotenv_path = os.path.join(PROJECT_ROOT, '.env')
+    if os.path.exists(dotenv_path):
+        load_dotenv(dotenv_path=dotenv_path)
+
+    client_db = None
+    if args.in_process:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            print("🔴 Error: --in-process needs mongomock-motor (pip install mongomock-motor).", file=sys.stderr)
+            sys.exit(1)
+        os.environ.setdefault("MONGODB_URI", "mongodb://localhost/app_bench")
+        os.chdir(PROJECT_ROOT) # /static and upload paths are relative to the project root
+        import services.db_service as db_service
+        from app import app
+        _patch_mongomock()
+
+        db = AsyncMongoMockClient()["app_bench"]
+        db_service._db_instance = db
+        await seed_database(db, args.posts, args.portfolio, args.content_kb * 1024)
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+        server_pid = None
+    else:
+        mongo_uri = os.getenv('MONGODB_URI')
+        if args.seed:
+            if not mongo_uri:
+                print("🔴 Error: MONGODB_URI environment variable not set.", file=sys.stderr)
+                sys.exit(1)
+            client_db = AsyncIOMotorClient(mongo_uri)
+            db = client_db.get_database()
+            # Seeding wipes blog_posts and portfolio, so never point it at a real database
+            if "bench" not in db.name and "test" not in db.name:
+                print(f"🔴 Error: refusing to seed '{db.name}'; use a database whose name contains 'bench' or 'test'.", file=sys.stderr)
+                sys.exit(1)
+            await seed_database(db, args.posts, args.portfolio, args.content_kb * 1024)
+        transport = None
+        base_url = args.base_url
+        server_pid = args.server_pid
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    results = []
+    uploaded: Set[str] = set()
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=60) as client:
+        token = await get_token(client) if "upload" in scenarios else None
+        print(f"\n{'scenario':<10}{'conc':>6}{'reqs':>7}{'errors':>8}{'RPS':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'RSS MB':>9}")
+        for scenario in scenarios:
+            # bcrypt makes logins ~100x slower than reads; keep their run short
+            total = max(1, args.requests // 10) if scenario == "login" else args.requests
+            for concurrency in levels:
+                result = await run_scenario(client, scenario, concurrency, total, token, args.unique_uploads, uploaded)
+                result["rss_mb"] = rss_megabytes(server_pid)
+                results.append(result)
+                rss = f"{result['rss_mb']:.0f}" if result["rss_mb"] is not None else "n/a"
+                print(
+                    f"{scenario:<10}{concurrency:>6}{result['requests']:>7}{result['errors']:>8}{result['rps']:>9.1f}"
+                    f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}{rss:>9}"
+                )
+                if result["errors"]:
+                    print(f"{'':<10}statuses: {result['statuses']}")
+
+    if args.in_process:
+        await cleanup_uploads(db, uploaded)
+    elif uploaded:
+        print(f"\n🟡 {len(uploaded)} files were uploaded to the server; remove them with scripts/gc_uploads.py --delete --min-age-hours 0.")
+    if client_db:
+        client_db.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"created_at": datetime.utcnow().isoformat(), "mode": "in-process" if args.in_process else base_url, "results": results}, f, indent=2)
+        print(f"\n✅ Results written to {args.output}")
+
+    if args.baseline and compare(results, args.baseline):
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the API: RPS, p50/p95/p99 latency and RSS per endpoint.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="Server to benchmark (default: http://127.0.0.1:8000).")
+    parser.add_argument("--in-process", action="store_true", help="Run the app in this process on an in-memory Mongo stand-in.")
+    parser.add_argument("--seed", action="store_true", help="Seed MONGODB_URI before running (database name must contain 'bench' or 'test').")
+    parser.add_argument("--posts", type=int, default=5000, help="Blog posts to seed (default: 5000).")
+    parser.add_argument("--portfolio", type=int, default=2000, help="Portfolio items to seed (default: 2000).")
+    parser.add_argument("--content-kb", type=int, default=20, help="HTML content size per seeded document in KB (default: 20).")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {', '.join(SCENARIOS)}.")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels (default: 1,8,32).")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario and level; logins use a tenth (default: 500).")
+    parser.add_argument("--unique-uploads", action="store_true", help="Make every upload distinct instead of hitting the dedup path.")
+    parser.add_argument("--server-pid", type=int, help="PID of the uvicorn worker, to report its RSS.")
+    parser.add_argument("--output", help="Write the results as JSON, e.g. to use as a later --baseline.")
+    parser.add_argument("--baseline", help="Previous --output file; exits with status 2 if RPS or p95 regressed by more than 10%%.")
+    asyncio.run(main(parser.parse_args()))
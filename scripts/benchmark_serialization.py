@@ -0,0 +1,104 @@
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+from typing import List
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+# Add project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routes.portfolio import PortfolioItem
+from routes.blog import BlogPostSummary
+from services.json_service import ListSerializer, orjson
+
+
+def make_portfolio_docs(count: int, content_bytes: int) -> List[dict]:
+    content = ("<p>" + "作品內容 lorem ipsum " * (content_bytes // 28 + 1))[:content_bytes] + "</p>"
+    now = datetime.now()
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"作品 {i}",
+            "description": "這是我的作品簡短描述",
+            "content": content,
+            "image_url": f"/static/uploads/{i:064x}.jpg",
+            "github_url": "https://github.com/example/project",
+            "tags": ["Python", "FastAPI", "MongoDB"],
+            "created_at": now - timedelta(days=i),
+        }
+        for i in range(count)
+    ]
+
+
+def make_blog_docs(count: int) -> List[dict]:
+    now = datetime.now()
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"文章 {i}",
+            "subtitle": "副標題",
+            "excerpt": "摘要 " * 40,
+            "tags": ["notes"],
+            "is_published": True,
+            "created_at": now - timedelta(days=i),
+            "published_at": now - timedelta(days=i),
+        }
+        for i in range(count)
+    ]
+
+
+def per_item_microseconds(fn, docs, repeat: int) -> float:
+    fn(docs) # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(docs)
+        best = min(best, time.perf_counter() - started)
+    return best / len(docs) * 1e6
+
+
+def main(count: int, content_bytes: int, repeat: int):
+    """
+    Compares the per-document cost of turning Mongo documents into a JSON list body:
+    - fastapi: what `response_model=List[...]` did before (validate, jsonable_encoder, stdlib json)
+    - pydantic: TypeAdapter.dump_json, the default path of ListSerializer
+    - orjson: the FAST_JSON_RESPONSES path of ListSerializer
+    """
+    cases = [
+        ("portfolio", PortfolioItem, make_portfolio_docs(count, content_bytes)),
+        ("blog summary", BlogPostSummary, make_blog_docs(count)),
+    ]
+    print(f"{count} documents per list, best of {repeat} runs, microseconds per document\n")
+    print(f"{'model':<14}{'fastapi':>10}{'pydantic':>10}{'orjson':>10}{'speedup':>10}")
+    for label, model, docs in cases:
+        serializer = ListSerializer(model)
+
+        def fastapi_path(items):
+            validated = serializer.adapter.validate_python(items)
+            return json.dumps(jsonable_encoder(validated), ensure_ascii=False).encode("utf-8")
+
+        baseline = per_item_microseconds(fastapi_path, docs, repeat)
+        validated = per_item_microseconds(serializer.dump_validated, docs, repeat)
+        if orjson is None:
+            print(f"{label:<14}{baseline:>10.1f}{validated:>10.1f}{'n/a':>10}{'':>10}")
+            continue
+        assert serializer.dump_fast(docs) == serializer.dump_validated(docs), f"{label}: fast path output differs"
+        fast = per_item_microseconds(serializer.dump_fast, docs, repeat)
+        print(f"{label:<14}{baseline:>10.1f}{validated:>10.1f}{fast:>10.1f}{baseline / fast:>9.1f}x")
+
+    if orjson is None:
+        print("\n🟡 orjson is not installed; the fast path is unavailable.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark list serialization: Pydantic response_model vs the orjson fast path.")
+    parser.add_argument("--count", type=int, default=1000, help="Documents per list (default: 1000).")
+    parser.add_argument("--content-bytes", type=int, default=8000, help="Size of each portfolio item's HTML content (default: 8000).")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (default: 5).")
+    args = parser.parse_args()
+    main(args.count, args.content_bytes, args.repeat)
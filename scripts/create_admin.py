@@ -54,7 +54,7 @@ async def create_admin_user():
 
         # --- Create user ---
         print(f"\nCreating user for email: {email}...")
-        user, error = user_model.create_user(
+        user, error = await user_model.create_user(
             email=email,
             password=password,
             nickname=nickname or email.split('@')[0]
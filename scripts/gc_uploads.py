@@ -0,0 +1,68 @@
+import os
+import sys
+import asyncio
+import argparse
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+# Run from the project root so UPLOAD_DIR ("static/uploads") resolves correctly
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)
+
+from services.storage_service import REFERENCING_COLLECTIONS, find_orphans, remove_upload
+
+
+async def main(delete: bool, min_age_hours: float, include_legacy: bool):
+    """
+    Lists (or with --delete removes) files in static/uploads that no document in
+    portfolio, blog_posts or settings references any more. Only files stored by /api/upload
+    (SHA-256 names) are considered unless include_legacy is set.
+    """
+    dotenv_path = os.path.join(PROJECT_ROOT, '.env')
+    if os.path.exists(dotenv_path):
+        load_dotenv(dotenv_path=dotenv_path)
+
+    mongo_uri = os.getenv('MONGODB_URI')
+    if not mongo_uri:
+        print("🔴 Error: MONGODB_URI environment variable not set.", file=sys.stderr)
+        sys.exit(1)
+
+    client = None
+    try:
+        client = AsyncIOMotorClient(mongo_uri)
+        db = client.get_database()
+        print(f"✅ Connected to database '{db.name}'. Scanning {', '.join(REFERENCING_COLLECTIONS)}...")
+
+        orphans = await find_orphans(db, min_age_seconds=min_age_hours * 3600, include_legacy=include_legacy)
+        if not orphans:
+            print("✅ No orphaned uploads found.")
+            return
+
+        freed = 0
+        for filename in orphans:
+            if delete:
+                freed += await remove_upload(db, filename)
+                print(f"🗑️  Removed {filename}")
+            else:
+                print(f"   Orphaned: {filename}")
+
+        if delete:
+            print(f"\n✅ Removed {len(orphans)} uploads, freed {freed / 1024 / 1024:.1f} MB.")
+        else:
+            print(f"\n🟡 {len(orphans)} orphaned uploads. Rerun with --delete to remove them.")
+    finally:
+        if client:
+            client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Garbage-collect uploads that no content references.")
+    parser.add_argument("--delete", action="store_true", help="Actually delete the orphaned files (default: dry run).")
+    parser.add_argument("--min-age-hours", type=float, default=24, help="Keep files younger than this (default: 24).")
+    parser.add_argument(
+        "--include-legacy", action="store_true",
+        help="Also consider files not named by SHA-256 (older or committed uploads, which the frontend may reference directly).",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.delete, args.min_age_hours, args.include_legacy))
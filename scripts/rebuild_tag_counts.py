@@ -0,0 +1,41 @@
+import os
+import sys
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+# Add project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.tag_service import rebuild_tag_counts
+
+
+async def main():
+    """
+    Recounts the tags of published posts and portfolio items and replaces the
+    materialized counts in `tag_counts`, e.g. after editing documents by hand.
+    """
+    dotenv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+    if os.path.exists(dotenv_path):
+        load_dotenv(dotenv_path=dotenv_path)
+
+    mongo_uri = os.getenv('MONGODB_URI')
+    if not mongo_uri:
+        print("🔴 Error: MONGODB_URI environment variable not set.", file=sys.stderr)
+        sys.exit(1)
+
+    client = None
+    try:
+        client = AsyncIOMotorClient(mongo_uri)
+        db = client.get_database()
+        print(f"✅ Connected to database '{db.name}'.")
+
+        tags = await rebuild_tag_counts(db)
+        print(f"🔄 Rebuilt tag counts: {tags} tags.")
+    finally:
+        if client:
+            client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+import math
+import os
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+# The recognizer needs 16 kHz; browsers usually capture at 44.1 or 48 kHz
+STT_SAMPLE_RATE = 16000
+# Chunks quieter than this (RMS, dB relative to full scale) count as silence
+TRANSLATOR_VAD_DBFS = float(os.getenv("TRANSLATOR_VAD_DBFS", -50))
+# Silence still forwarded after speech; must exceed the recognizer's 800 ms end-of-sentence timeout
+TRANSLATOR_VAD_HANGOVER_MS = int(os.getenv("TRANSLATOR_VAD_HANGOVER_MS", 1200))
+# Silence kept and forwarded when speech resumes, so the start of the first word is not cut off
+TRANSLATOR_VAD_PREROLL_MS = int(os.getenv("TRANSLATOR_VAD_PREROLL_MS", 300))
+
+# Anti-aliasing low-pass: flat up to 0.45 x the output rate, at least this many dB down from
+# the output Nyquist frequency on, so nothing above it folds back into the speech band
+PASSBAND_RATIO = 0.45
+STOPBAND_ATTENUATION_DB = 60.0
+
+
+def lowpass_kernel(input_rate: int, output_rate: int) -> np.ndarray:
+    """Kaiser-windowed sinc FIR (odd length, unity DC gain) for resampling input_rate down to output_rate."""
+    passband = PASSBAND_RATIO * output_rate
+    stopband = 0.5 * output_rate
+    cutoff = (passband + stopband) / 2 / input_rate # Cycles per input sample
+    transition = 2 * math.pi * (stopband - passband) / input_rate
+    attenuation = STOPBAND_ATTENUATION_DB
+    # Kaiser's estimates of the window shape and length for this attenuation and transition width
+    beta = 0.1102 * (attenuation - 8.7)
+    taps = math.ceil((attenuation - 7.95) / (2.285 * transition)) + 1
+    taps += 1 - taps % 2
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(taps, beta)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+class AudioIngest:
+    """
+    Turns the client's 16-bit mono PCM chunks into what the recognizer gets: low-pass filtered
+    and resampled to STT_SAMPLE_RATE (linear interpolation of the filtered signal, which is exact
+    decimation for 48 kHz), and with long silences dropped by an energy gate. The filter,
+    interpolation and byte alignment carry over from one chunk to the next. Silence shorter
+    than the hangover is kept, since the recognizer needs it to end a sentence.
+    """
+
+    def __init__(
+        self,
+        input_rate: int,
+        vad_dbfs: float = TRANSLATOR_VAD_DBFS,
+        hangover_ms: int = TRANSLATOR_VAD_HANGOVER_MS,
+        preroll_ms: int = TRANSLATOR_VAD_PREROLL_MS,
+    ):
+        self.input_rate = input_rate
+        self.output_rate = min(input_rate, STT_SAMPLE_RATE)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._odd_byte = b"" # Second half of a sample split across chunks
+
+        self._step = input_rate / self.output_rate
+        self._kernel = lowpass_kernel(input_rate, self.output_rate) if self._step > 1 else np.ones(1, dtype=np.float32)
+        self._history = np.zeros(self._kernel.size - 1, dtype=np.float32) # Raw samples the next filter window overlaps
+        self._last = np.zeros(1, dtype=np.float32) # Last filtered sample, at index _count - 1
+        self._count = 0 # Filtered samples so far
+        self._next = 0.0 # Position of the next output sample, in filtered samples
+
+        self._threshold = 32768.0 * 10 ** (vad_dbfs / 20)
+        self._hangover = hangover_ms * self.output_rate // 1000
+        self._silent_run = self._hangover # Samples since speech; starts closed
+        self._preroll = deque()
+        self._preroll_samples = 0
+        self._preroll_max = preroll_ms * self.output_rate // 1000
+
+    def resample(self, samples: np.ndarray) -> np.ndarray:
+        if self._step == 1.0 or not samples.size:
+            return samples
+        buf = np.concatenate((self._history, samples))
+        self._history = buf[buf.size - self._history.size:]
+        filtered = np.convolve(buf, self._kernel, mode="valid")
+        values = np.concatenate((self._last, filtered))
+        start = self._count - 1
+        self._count += filtered.size
+        self._last = values[-1:]
+        positions = np.arange(self._next, self._count - 1, self._step)
+        if positions.size:
+            self._next = positions[-1] + self._step
+        return np.interp(positions, np.arange(start, self._count), values).astype(np.float32)
+
+    def process(self, chunk: bytes) -> bytes:
+        """Returns the bytes to write to the recognizer's stream for one client chunk (possibly none)."""
+        self.bytes_in += len(chunk)
+        chunk = self._odd_byte + bytes(chunk)
+        usable = len(chunk) - len(chunk) % 2
+        self._odd_byte = chunk[usable:]
+        raw = np.frombuffer(chunk, dtype="<i2", count=usable // 2).astype(np.float32)
+        samples = self.resample(raw)
+        if not samples.size:
+            return b""
+        data = np.clip(np.rint(samples), -32768, 32767).astype("<i2").tobytes()
+
+        rms = float(np.sqrt(np.mean(samples * samples)))
+        if rms >= self._threshold:
+            self._silent_run = 0
+            data = b"".join(self._preroll) + data
+            self._preroll.clear()
+            self._preroll_samples = 0
+        else:
+            self._silent_run += samples.size
+            if self._silent_run > self._hangover:
+                # Gate closed: keep only the most recent silence, for the pre-roll
+                self._preroll.append(data)
+                self._preroll_samples += samples.size
+                while self._preroll and self._preroll_samples > self._preroll_max:
+                    self._preroll_samples -= len(self._preroll.popleft()) // 2
+                return b""
+        self.bytes_out += len(data)
+        return data
+
+    def stats(self) -> Dict[str, float]:
+        saved = self.bytes_in - self.bytes_out
+        return {
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": saved,
+            "saved_ratio": round(saved / self.bytes_in, 3) if self.bytes_in else 0.0,
+        }
@@ -6,7 +6,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 
-from models.user import UserModel
+from models.user import UserModel, principal_cache
 from services.db_service import get_database
 
 # --- Configuration ---
@@ -47,13 +47,21 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get
         if email is None:
             raise credentials_exception
         token_data = TokenData(email=email)
+        token_version = payload.get("ver", 0)
     except JWTError:
         raise credentials_exception
 
+    # Repeat requests with the same token are answered from the local principal cache
+    cache_key = (token_data.email, token_version)
+    user = principal_cache.get(cache_key)
+    if user is not None:
+        return user
+
     user_model = UserModel(db)
     user = await user_model.find_by_email(email=token_data.email)
-    if user is None:
+    if user is None or user.get("token_version", 0) != token_version:
         raise credentials_exception
+    principal_cache.set(cache_key, user)
     # You might want to return a Pydantic model of the user instead of the raw dict
     return user
 
@@ -0,0 +1,98 @@
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+import pytz
+from pymongo import ReturnDocument
+
+# How long a worker trusts its local copy of a collection version before asking Mongo again.
+# This bounds how stale another uvicorn worker's cache can be after an admin write.
+CACHE_VERSION_TTL_SECONDS = float(os.getenv("CACHE_VERSION_TTL_SECONDS", 5))
+
+# Collection holding one counter document per cached collection: {_id: name, version, updated_at}
+VERSIONS_COLLECTION = "cache_versions"
+
+
+class CollectionVersion(NamedTuple):
+    version: int
+    updated_at: Optional[datetime]
+
+
+# name -> (version, monotonic time it was last confirmed against Mongo)
+_local_versions: Dict[str, Tuple[CollectionVersion, float]] = {}
+
+
+def _from_doc(doc) -> CollectionVersion:
+    if not doc:
+        return CollectionVersion(0, None)
+    return CollectionVersion(doc.get("version", 0), doc.get("updated_at"))
+
+
+async def get_collection_version(db, name: str) -> CollectionVersion:
+    """
+    Returns the shared version counter of a collection.
+    The value is memoized per worker for CACHE_VERSION_TTL_SECONDS, so hot reads
+    only touch Mongo once per window instead of once per request.
+    """
+    cached = _local_versions.get(name)
+    now = time.monotonic()
+    if cached and now - cached[1] < CACHE_VERSION_TTL_SECONDS:
+        return cached[0]
+
+    doc = await db[VERSIONS_COLLECTION].find_one({"_id": name})
+    version = _from_doc(doc)
+    _local_versions[name] = (version, now)
+    return version
+
+
+async def bump_collection_version(db, name: str) -> CollectionVersion:
+    """
+    Increments the version counter of a collection after a write.
+    The local worker sees the new version immediately; other workers pick it up
+    within CACHE_VERSION_TTL_SECONDS.
+    """
+    doc = await db[VERSIONS_COLLECTION].find_one_and_update(
+        {"_id": name},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(pytz.utc)}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    version = _from_doc(doc)
+    _local_versions[name] = (version, time.monotonic())
+    return version
+
+
+class TTLCache:
+    """
+    Small per-worker cache whose entries expire after `ttl_seconds`.
+    The least recently used entry is evicted once `maxsize` is reached.
+    """
+
+    def __init__(self, ttl_seconds: float, maxsize: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Drops every entry whose key matches `predicate`."""
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
@@ -0,0 +1,335 @@
+import html
+import math
+import os
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from services.text_service import html_to_text
+from services.worker_pool import run_in_process
+
+# Content longer than this (characters) is analyzed in the process pool instead of on the event loop
+CONTENT_ANALYSIS_INLINE_MAX = int(os.getenv("CONTENT_ANALYSIS_INLINE_MAX", 20000))
+
+EXCERPT_LENGTH = 160
+WORDS_PER_MINUTE = 200
+CJK_CHARS_PER_MINUTE = 400
+
+# Fields computed from `content` on every write; values sent by clients are ignored
+DERIVED_FIELDS = ("excerpt", "word_count", "reading_minutes", "toc")
+
+ALLOWED_TAGS = {
+    "a", "abbr", "b", "blockquote", "br", "caption", "code", "del", "details", "div", "em", "figcaption",
+    "figure", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "i", "iframe", "img", "ins", "kbd", "li", "mark",
+    "ol", "p", "pre", "s", "small", "span", "strong", "sub", "summary", "sup", "table", "tbody", "td",
+    "tfoot", "th", "thead", "tr", "u", "ul",
+}
+VOID_TAGS = {"br", "hr", "img"}
+# Dropped together with everything inside them
+DROP_CONTENT_TAGS = {"script", "style", "noscript", "template", "object", "embed", "svg", "math", "form", "textarea", "select", "button"}
+GLOBAL_ATTRS = {"class", "id", "title", "lang", "dir", "align"}
+TAG_ATTRS = {
+    "a": {"href", "target", "rel", "name"},
+    "img": {"src", "alt", "width", "height", "loading"},
+    "iframe": {"src", "width", "height", "allow", "allowfullscreen", "frameborder"},
+    "ol": {"start", "type"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan", "scope"},
+    "details": {"open"},
+}
+URL_ATTRS = {"href", "src"}
+SAFE_URL_SCHEMES = {"http", "https", "mailto", "tel"}
+# Only video players may be embedded; any other iframe is dropped with its content
+IFRAME_HOSTS = {"www.youtube.com", "www.youtube-nocookie.com", "player.vimeo.com"}
+
+# Markdown code is shown as text, never parsed as HTML, so it is kept verbatim. Anything that
+# could be read as HTML instead is sanitized: when in doubt, text is treated as HTML, not code.
+_BLOCK_RE = re.compile(
+    # Fenced code blocks (``` or ~~~, up to the closing fence or the end)
+    r"^ {0,3}(?P<fence>(?P<marks>`{3,}|~{3,})[^\n]*\n.*?(?:^ {0,3}(?P=marks)[ \t]*$|\Z))"
+    # HTML blocks: their content is raw HTML, so backticks in them are not code
+    r"|^ {0,3}(?P<html><(?:"
+    r"(?P<raw>script|pre|style|textarea)(?=[\s>]|$).*?(?:</(?P=raw)>[^\n]*|\Z)"
+    r"|!--.*?(?:-->[^\n]*|\Z)"
+    r"|[?!/A-Za-z].*?(?=\n[ \t]*\n|\Z)))",
+    re.M | re.S | re.I,
+)
+_INLINE_RE = re.compile(
+    # A tag (quoted attribute values may hold backticks and ">") is HTML, even if unterminated
+    r"(?P<tag><[A-Za-z/!?](?:[^>\"']|\"[^\"]*\"?|'[^']*'?)*>?)"
+    # A code span opens on an unescaped backtick run, closes with a run of the same length
+    # and never crosses a blank line
+    r"|(?P<code>(?<![`\\])(?P<ticks>`+)(?!`)(?:(?!\n[ \t]*\n).)+?(?<!`)(?P=ticks)(?!`))",
+    re.S,
+)
+# Markdown autolinks, <scheme:...> and <user@host>, kept as they are when their scheme is safe
+_AUTOLINK_RE = re.compile(
+    r"<(?:[A-Za-z][A-Za-z0-9+.-]{1,31}:[^\s<>]*"
+    r"|[A-Za-z0-9.!#$%&'*+/=?^_`{|}~-]+@[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?"
+    r"(?:\.[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?)*)>"
+)
+_ATX_HEADING_RE = re.compile(r"^ {0,3}(#{1,6})[ \t]+(.+?)[ \t#]*$", re.M)
+_SLUG_STRIP_RE = re.compile(r"[^\w\- ]", re.U)
+_CJK_CHAR_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+_WORD_RE = re.compile(r"[0-9A-Za-z\uac00-\ud7af]+(?:['\u2019.\-][0-9A-Za-z\uac00-\ud7af]+)*")
+
+# Markdown syntax removed for the plain text (excerpt, word count, search)
+_MARKDOWN_TEXT_RULES: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r"!\[([^\]]*)\]\([^)]*\)"), ""), # images
+    (re.compile(r"\[([^\]]*)\]\([^)]*\)"), r"\1"), # links keep their text
+    (re.compile(r"<([a-zA-Z][a-zA-Z0-9+.-]*:[^\s<>]*|[^\s<>@]+@[^\s<>]+)>"), r"\1"), # autolinks
+    (re.compile(r"^ {0,3}(#{1,6}|>+|[-*+]|\d+[.)])[ \t]+", re.M), ""), # heading, quote and list markers
+    (re.compile(r"^[ \t]*\|?[ \t:|-]+\|[ \t:|-]*$", re.M), ""), # table delimiter rows
+    (re.compile(r"\*{1,3}|_{2,3}|~~|`+|\|"), " "),
+]
+
+
+def _safe_url(value: str) -> bool:
+    scheme = urlsplit(value.strip()).scheme.lower()
+    # Relative URLs (/static/..., #anchor) have no scheme
+    return not scheme or scheme in SAFE_URL_SCHEMES
+
+
+class _Sanitizer(HTMLParser):
+    """
+    Re-emits a fragment with only allowed tags and attributes. Text and entities are copied
+    verbatim (convert_charrefs=False), so the Markdown between the tags is left untouched.
+    Records where each HTML heading starts in the output, for the table of contents.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.out: List[str] = []
+        self.length = 0
+        self.headings: List[Tuple[int, int, str, Optional[str]]] = [] # (output offset, level, text, id)
+        self._skip: Optional[str] = None
+        self._skip_depth = 0
+        self._heading: Optional[Tuple[int, int, Optional[str], List[str]]] = None
+
+    def _emit(self, text: str) -> None:
+        self.out.append(text)
+        self.length += len(text)
+
+    def _attrs(self, tag: str, attrs) -> Optional[str]:
+        allowed = GLOBAL_ATTRS | TAG_ATTRS.get(tag, set())
+        kept = []
+        for name, value in attrs:
+            if name not in allowed or name.startswith("on"):
+                continue
+            if name in URL_ATTRS and not _safe_url(value or ""):
+                continue
+            kept.append(name if value is None else f'{name}="{html.escape(value, quote=True)}"')
+        if tag == "iframe" and not any(
+            name == "src" and (urlsplit(value or "").hostname or "") in IFRAME_HOSTS for name, value in attrs
+        ):
+            return None
+        if tag == "a" and any(name == "target" for name, _ in attrs):
+            kept = [a for a in kept if not a.startswith("rel")] + ['rel="noopener noreferrer"']
+        return "".join(f" {a}" for a in kept)
+
+    def _start(self, tag: str, attrs, self_closing: bool) -> None:
+        if self._skip:
+            if tag == self._skip and not self_closing:
+                self._skip_depth += 1
+            return
+        if ":" in tag or "@" in tag:
+            # A Markdown autolink such as <https://example.com> is kept; anything else shaped
+            # like one (<a:b onclick=...>) is escaped, so it can only ever be shown as text
+            text = self.get_starttag_text()
+            if _AUTOLINK_RE.fullmatch(text) and _safe_url(text[1:-1]):
+                self._emit(text)
+            else:
+                self._emit("&lt;" + text[1:])
+            return
+        if tag in DROP_CONTENT_TAGS:
+            if not self_closing:
+                self._skip, self._skip_depth = tag, 1
+            return
+        if tag not in ALLOWED_TAGS:
+            return
+        attributes = self._attrs(tag, attrs)
+        if attributes is None:
+            if not self_closing:
+                self._skip, self._skip_depth = tag, 1
+            return
+        if tag in ("h1", "h2", "h3", "h4", "h5", "h6") and not self_closing:
+            self._heading = (self.length, int(tag[1]), dict(attrs).get("id"), [])
+        self._emit(f"<{tag}{attributes}{' /' if self_closing and tag in VOID_TAGS else ''}>")
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=True)
+
+    def handle_endtag(self, tag):
+        if self._skip:
+            if tag == self._skip:
+                self._skip_depth -= 1
+                if not self._skip_depth:
+                    self._skip = None
+            return
+        if tag not in ALLOWED_TAGS or tag in VOID_TAGS:
+            return
+        if self._heading and tag == f"h{self._heading[1]}":
+            offset, level, anchor, parts = self._heading
+            self.headings.append((offset, level, html_to_text("".join(parts)), anchor))
+            self._heading = None
+        self._emit(f"</{tag}>")
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._heading:
+            self._heading[3].append(data)
+        self._emit(data)
+
+    def handle_entityref(self, name):
+        self.handle_data(f"&{name};")
+
+    def handle_charref(self, name):
+        self.handle_data(f"&#{name};")
+
+    # Comments, doctypes, processing instructions and CDATA are dropped
+
+    def finish(self) -> None:
+        """
+        Flushes the input. A tag left unfinished at the end (`<img src=x onerror=...`) is
+        escaped instead of being passed through as text.
+        """
+        remainder, self.rawdata = self.rawdata, ""
+        self.close()
+        if remainder and not self._skip:
+            self.handle_data(remainder.replace("<", "&lt;"))
+
+
+def _split_code(content: str) -> List[Tuple[Optional[str], str]]:
+    """Splits Markdown into (kind, text) segments; kind is "fence", "code" or None for Markdown and HTML."""
+    segments: List[Tuple[Optional[str], str]] = []
+
+    def split_inline(text: str) -> None:
+        position = 0
+        for match in _INLINE_RE.finditer(text):
+            if match.group("code") is None:
+                continue
+            if match.start() > position:
+                segments.append((None, text[position:match.start()]))
+            segments.append(("code", match.group(0)))
+            position = match.end()
+        if position < len(text):
+            segments.append((None, text[position:]))
+
+    position = 0
+    for match in _BLOCK_RE.finditer(content):
+        split_inline(content[position:match.start()])
+        # No code is looked for inside an HTML block
+        segments.append(("fence" if match.group("fence") is not None else None, match.group(0)))
+        position = match.end()
+    split_inline(content[position:])
+    return segments
+
+
+def markdown_to_text(content: Optional[str]) -> str:
+    """Plain text of Markdown with inline HTML: syntax, tags and fenced code blocks removed."""
+    if not content:
+        return ""
+    parts = []
+    for kind, text in _split_code(content):
+        if kind == "fence":
+            continue
+        for pattern, replacement in _MARKDOWN_TEXT_RULES:
+            text = pattern.sub(replacement, text)
+        parts.append(text)
+    return html_to_text(" ".join(parts))
+
+
+def make_excerpt(text: Optional[str], length: int = EXCERPT_LENGTH) -> Optional[str]:
+    """Truncates plain text to an excerpt."""
+    if not text:
+        return None
+    if len(text) > length:
+        text = text[:length].rstrip() + "…"
+    return text
+
+
+def slugify(text: str) -> str:
+    """Heading anchor in the style of GitHub (and rehype-slug): lowercase, punctuation dropped, spaces to dashes."""
+    return _SLUG_STRIP_RE.sub("", text.strip().lower()).replace(" ", "-")
+
+
+def _unique_slug(text: str, used: Dict[str, int]) -> str:
+    base = slugify(text) or "section"
+    count = used.get(base, 0)
+    used[base] = count + 1
+    return base if count == 0 else f"{base}-{count}"
+
+
+def sanitize_content(content: str) -> Tuple[str, List[Tuple[int, int, str, Optional[str]]]]:
+    """Sanitizes the HTML inside Markdown outside of code; returns it with its headings (offset, level, text, id)."""
+    out, headings, length = [], [], 0
+    for kind, text in _split_code(content):
+        if kind:
+            out.append(text)
+        else:
+            sanitizer = _Sanitizer()
+            sanitizer.feed(text)
+            sanitizer.finish()
+            clean = "".join(sanitizer.out)
+            out.append(clean)
+            headings.extend((length + offset, level, title, anchor) for offset, level, title, anchor in sanitizer.headings)
+            headings.extend(
+                (length + match.start(), len(match.group(1)), markdown_to_text(match.group(2)), None)
+                for match in _ATX_HEADING_RE.finditer(clean)
+            )
+        length += len(out[-1])
+    return "".join(out), sorted(headings, key=lambda heading: heading[0])
+
+
+def analyze_content(content: str) -> dict:
+    """
+    One pass over a post's Markdown/HTML at write time: sanitized content, plain-text excerpt,
+    word count (CJK characters count as one word each), reading time and table of contents.
+    Module-level and picklable, so it can run in the process pool.
+    """
+    sanitized, headings = sanitize_content(content)
+    text = markdown_to_text(sanitized)
+    cjk_chars = len(_CJK_CHAR_RE.findall(text))
+    words = len(_WORD_RE.findall(text))
+    minutes = words / WORDS_PER_MINUTE + cjk_chars / CJK_CHARS_PER_MINUTE
+
+    used: Dict[str, int] = {}
+    toc = [
+        {"level": level, "text": title, "id": anchor or _unique_slug(title, used)}
+        for _, level, title, anchor in headings if title
+    ]
+    return {
+        "content": sanitized,
+        "excerpt": make_excerpt(text),
+        "word_count": words + cjk_chars,
+        "reading_minutes": math.ceil(minutes) if words or cjk_chars else 0,
+        "toc": toc,
+    }
+
+
+async def analyze_content_async(content: str) -> dict:
+    if len(content) > CONTENT_ANALYSIS_INLINE_MAX:
+        return await run_in_process(analyze_content, content)
+    return analyze_content(content)
+
+
+async def with_content_analysis(fields: dict) -> dict:
+    """
+    Prepares the fields of a create or update: drops derived fields sent by the client and,
+    when `content` is being written, replaces it with the sanitized version and adds the
+    derived fields. Updates that leave `content` alone keep the stored ones.
+    """
+    for field in DERIVED_FIELDS:
+        fields.pop(field, None)
+    if "content" in fields:
+        if fields["content"]:
+            fields.update(await analyze_content_async(fields["content"]))
+        else:
+            fields.update(excerpt=None, word_count=0, reading_minutes=0, toc=[])
+    return fields
+
@@ -4,6 +4,9 @@ from contextlib import asynccontextmanager
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 import dns.resolver # Import dnspython resolver
+from services.index_service import apply_indexes
+from services.metrics_service import mongo_command_listener
+from services.tag_service import ensure_tag_counts
 
 # Fix for DNS resolution issues (e.g., "The resolution lifetime expired")
 # Force using Google DNS if the local system DNS (often 100.100.100.100 on some setups) fails or times out.
@@ -30,12 +33,24 @@ async def connect_to_mongo():
     
     print("DEBUG (db_service): Attempting to connect to MongoDB...")
     try:
-        _mongo_client_instance = AsyncIOMotorClient(mongo_uri)
+        # The listener attributes query count and time to each request (see services/metrics_service.py)
+        _mongo_client_instance = AsyncIOMotorClient(mongo_uri, event_listeners=[mongo_command_listener])
         _db_instance = _mongo_client_instance.get_database()
         print("✅ MongoDB (db_service) connected successfully!")
     except Exception as e:
         print(f"\n🔴 ERROR (db_service): Failed to connect to MongoDB: {e}", file=sys.stderr)
         sys.exit(1)
+
+    # Idempotent index bootstrap; set MONGO_APPLY_INDEXES=false to manage indexes with scripts/apply_indexes.py only
+    if os.getenv('MONGO_APPLY_INDEXES', 'true').lower() != 'false':
+        try:
+            created = await apply_indexes(_db_instance)
+            print(f"✅ MongoDB (db_service) indexes ensured: {len(created)}")
+        except Exception as e:
+            print(f"⚠️ WARNING (db_service): Index bootstrap failed, continuing without it: {e}", file=sys.stderr)
+
+    # Backfills the materialized tag counts once; afterwards content writes keep them current
+    await ensure_tag_counts(_db_instance)
     
     yield # Connection is established and db_instance is set
 
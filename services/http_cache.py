@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, NamedTuple, Optional
+
+from fastapi import Request, Response, status
+
+from services.cache_service import get_collection_version
+
+# Browsers/CDNs may store the body but must revalidate it; revalidation is what the 304 path makes cheap.
+CACHE_CONTROL = "no-cache"
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[datetime]
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL}
+        if self.last_modified:
+            last_modified = _http_date_ceiling(self.last_modified)
+            # Until that second is over, another write could land in it with the same HTTP date;
+            # leaving Last-Modified out makes clients revalidate with the ETag alone
+            if last_modified <= datetime.now(timezone.utc):
+                headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+        return headers
+
+
+def _as_utc(dt: datetime) -> datetime:
+    # Motor returns naive datetimes that are already UTC.
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def _http_date_ceiling(dt: datetime) -> datetime:
+    """HTTP dates have one-second resolution; rounding up keeps a write after the date from comparing as older."""
+    dt = _as_utc(dt)
+    if dt.microsecond:
+        dt = dt.replace(microsecond=0) + timedelta(seconds=1)
+    return dt
+
+
+def make_etag(*parts) -> str:
+    """Builds a strong ETag from the given key parts."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+async def collection_validators(db, collection: str, *key_parts) -> Validators:
+    """
+    Computes the validators of a resource that is derived from a single collection.
+    Only the (memoized) collection version is consulted, so no documents are loaded.
+    """
+    version = await get_collection_version(db, collection)
+    return Validators(make_etag(collection, version.version, *key_parts), version.updated_at)
+
+
+async def combined_validators(db, collections, *key_parts) -> Validators:
+    """Validators of a resource assembled from several collections; any write to one of them changes the ETag."""
+    versions = await asyncio.gather(*(get_collection_version(db, collection) for collection in collections))
+    etag = make_etag(*(f"{c}:{v.version}" for c, v in zip(collections, versions)), *key_parts)
+    timestamps = [v.updated_at for v in versions if v.updated_at]
+    return Validators(etag, max(timestamps) if timestamps else None)
+
+
+def is_not_modified(request: Request, validators: Validators) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2).
+        # "*" is ignored: validators are checked before the resource is looked up, so honoring it
+        # would answer 304 for a document that does not exist (RFC 9110 13.1.2 lets GET ignore it).
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return any(tag.removeprefix("W/") == validators.etag for tag in candidates)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and validators.last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return _http_date_ceiling(validators.last_modified) <= since
+    return False
+
+
+def not_modified(request: Request, validators: Validators) -> Optional[Response]:
+    """Returns a 304 response when the client's cached copy is still current, otherwise None."""
+    if request.method in ("GET", "HEAD") and is_not_modified(request, validators):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators.headers())
+    return None
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import sys
+from datetime import datetime
+from typing import Optional, Set
+
+import pytz
+
+from services.worker_pool import run_in_process
+
+UPLOAD_DIR = "static/uploads"
+VARIANT_DIR = os.path.join(UPLOAD_DIR, "variants")
+# Fixed responsive widths; widths larger than the original are skipped (no upscaling)
+VARIANT_WIDTHS = (320, 640, 960, 1280, 1920)
+VARIANT_FORMAT = "webp"
+VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", 80))
+
+MEDIA_COLLECTION = "media"
+
+# Strong references to running jobs, otherwise asyncio may garbage-collect them mid-flight
+_background_jobs: Set[asyncio.Task] = set()
+
+
+def variant_filename(filename: str, width: int) -> str:
+    stem = os.path.splitext(filename)[0]
+    return f"{stem}-{width}w.{VARIANT_FORMAT}"
+
+
+def generate_variants(source_path: str, output_dir: str) -> dict:
+    """
+    Runs in a worker process: writes resized WebP copies of one image and returns their metadata.
+    EXIF orientation is applied to the pixels and the metadata itself is not copied over.
+    """
+    # Imported here so the web worker starts even if Pillow is not installed
+    from PIL import Image, ImageOps
+
+    os.makedirs(output_dir, exist_ok=True)
+    filename = os.path.basename(source_path)
+
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if image.mode in ("LA", "P", "PA") else "RGB")
+        width, height = image.size
+
+        variants = []
+        widths = [w for w in VARIANT_WIDTHS if w < width] + [min(width, VARIANT_WIDTHS[-1])]
+        for target_width in sorted(set(widths)):
+            target_height = max(1, round(height * target_width / width))
+            resized = image if target_width == width else image.resize((target_width, target_height), Image.LANCZOS)
+            name = variant_filename(filename, target_width)
+            resized.save(os.path.join(output_dir, name), VARIANT_FORMAT, quality=VARIANT_QUALITY, method=4)
+            variants.append({
+                "width": target_width,
+                "height": target_height,
+                "format": VARIANT_FORMAT,
+                "url": f"/{output_dir.replace(os.path.sep, '/')}/{name}",
+            })
+
+    return {"width": width, "height": height, "variants": variants}
+
+
+async def process_upload(db, filename: str) -> Optional[dict]:
+    """Generates the derivatives of an uploaded file and records them in the media collection."""
+    try:
+        info = await run_in_process(generate_variants, os.path.join(UPLOAD_DIR, filename), VARIANT_DIR)
+    except Exception as e:
+        print(f"Error generating image variants for {filename}: {e}", file=sys.stderr)
+        return None
+
+    media_doc = {
+        "url": f"/{UPLOAD_DIR}/{filename}",
+        **info,
+        "processed_at": datetime.now(pytz.utc),
+    }
+    await db[MEDIA_COLLECTION].update_one({"_id": filename}, {"$set": media_doc}, upsert=True)
+    return media_doc
+
+
+def enqueue_derivatives(db, filename: str) -> None:
+    """Schedules derivative generation without delaying the upload response."""
+    task = asyncio.create_task(process_upload(db, filename))
+    _background_jobs.add(task)
+    task.add_done_callback(_background_jobs.discard)
+
+
+def pick_variant(media_doc: dict, width: int) -> Optional[dict]:
+    """Returns the smallest variant at least `width` wide, or the largest one available."""
+    variants = sorted(media_doc.get("variants", []), key=lambda v: v["width"])
+    if not variants:
+        return None
+    for variant in variants:
+        if variant["width"] >= width:
+            return variant
+    return variants[-1]
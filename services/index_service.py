@@ -0,0 +1,70 @@
+import sys
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+# Declarative index registry: collection name -> indexes the queries in routes/ and models/ rely on.
+# Add new entries here; connect_to_mongo applies them idempotently on startup.
+INDEX_REGISTRY: Dict[str, List[IndexModel]] = {
+    "blog_posts": [
+        # GET /blog: find({is_published}).sort(published_at, _id) plus keyset pagination
+        IndexModel([("is_published", ASCENDING), ("published_at", DESCENDING), ("_id", DESCENDING)], name="published_listing"),
+        # GET /blog?publishedOnly=false
+        IndexModel([("published_at", DESCENDING), ("_id", DESCENDING)], name="published_at_desc"),
+        # GET /blog/all (admin)
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+        # GET /blog?tag=: multikey on tags, then the same order as published_listing
+        IndexModel([("tags", ASCENDING), ("is_published", ASCENDING), ("published_at", DESCENDING), ("_id", DESCENDING)], name="tags_published_listing"),
+    ],
+    "portfolio": [
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+        # GET /portfolio?tag=
+        IndexModel([("tags", ASCENDING), ("created_at", DESCENDING)], name="tags_created_at"),
+    ],
+    "tag_counts": [
+        # services/tag_service.py: $inc upserts by (kind, tag)
+        IndexModel([("kind", ASCENDING), ("tag", ASCENDING)], name="kind_tag_unique", unique=True),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("reset_token", ASCENDING)], name="reset_token", sparse=True),
+    ],
+    "newsletter_subscribers": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "settings": [
+        IndexModel([("settings_id", ASCENDING)], name="settings_id_unique", unique=True),
+    ],
+}
+
+
+async def apply_indexes(db) -> List[str]:
+    """
+    Creates every registered index. Existing indexes with the same spec are a no-op,
+    so this is safe to run on every startup. A collection that fails (e.g. duplicate
+    emails blocking a unique index) is reported and skipped instead of aborting startup.
+    """
+    created = []
+    for collection, indexes in INDEX_REGISTRY.items():
+        try:
+            names = await db[collection].create_indexes(indexes)
+            created.extend(f"{collection}.{name}" for name in names)
+        except OperationFailure as e:
+            print(f"🔴 ERROR (index_service): Could not create indexes on '{collection}': {e}", file=sys.stderr)
+    return created
+
+
+async def verify_indexes(db) -> Dict[str, List[str]]:
+    """Returns the registered indexes that are missing or differ from the registry, per collection."""
+    problems: Dict[str, List[str]] = {}
+    for collection, indexes in INDEX_REGISTRY.items():
+        existing = await db[collection].index_information()
+        for index in indexes:
+            spec = index.document
+            current = existing.get(spec["name"])
+            if current is None:
+                problems.setdefault(collection, []).append(f"{spec['name']}: missing")
+            elif list(current["key"]) != list(spec["key"].items()) or current.get("unique", False) != spec.get("unique", False):
+                problems.setdefault(collection, []).append(f"{spec['name']}: definition differs from registry")
+    return problems
@@ -0,0 +1,74 @@
+import os
+from typing import Any, Dict, Iterable, List, Tuple, Type
+
+from bson import ObjectId
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import PydanticUndefined
+
+from services.metrics_service import timed_phase
+
+try:
+    import orjson
+except ImportError: # Optional; without it every list goes through Pydantic
+    orjson = None
+
+# Opt-in: serialize trusted Mongo documents straight to JSON bytes, skipping Pydantic validation
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class ListSerializer:
+    """
+    Turns a list of Mongo documents into the JSON bytes that `response_model=List[model]`
+    (with response_model_by_alias=False) would produce.
+
+    The default path validates through Pydantic. The fast path (FAST_JSON_RESPONSES=true,
+    orjson installed) only reshapes each document: keys follow the model's field order,
+    `_id` becomes `id`, missing fields get their defaults and unknown keys are dropped.
+    ObjectId and datetime are encoded natively by orjson. Types are not checked, which
+    is safe only because the documents were validated by the same models when written.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.adapter = TypeAdapter(List[model])
+        # (output key, document key, default value, default factory)
+        self._fields: List[Tuple[str, str, Any, Any]] = [
+            (name, field.alias or name, field.default, field.default_factory)
+            for name, field in model.model_fields.items()
+        ]
+
+    @property
+    def projection(self) -> Dict[str, int]:
+        """Mongo projection that loads only the fields the model returns."""
+        return {key: 1 for _, key, _, _ in self._fields}
+
+    def _reshape(self, doc: dict) -> dict:
+        out = {}
+        for name, key, default, factory in self._fields:
+            if key in doc:
+                out[name] = doc[key]
+            elif name in doc:
+                out[name] = doc[name]
+            elif factory is not None:
+                out[name] = factory()
+            elif default is not PydanticUndefined:
+                out[name] = default
+        return out
+
+    def dump_fast(self, docs: Iterable[dict]) -> bytes:
+        return orjson.dumps([self._reshape(doc) for doc in docs], default=_default, option=orjson.OPT_UTC_Z)
+
+    def dump_validated(self, docs: Iterable[dict]) -> bytes:
+        return self.adapter.dump_json(self.adapter.validate_python(docs))
+
+    def dump(self, docs: Iterable[dict]) -> bytes:
+        with timed_phase("serialize"):
+            if FAST_JSON_RESPONSES and orjson is not None:
+                return self.dump_fast(docs)
+            return self.dump_validated(docs)
@@ -0,0 +1,267 @@
+import contextvars
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Mongo commands slower than this are logged to stderr with the route that issued them
+MONGO_SLOW_QUERY_MS = float(os.getenv("MONGO_SLOW_QUERY_MS", 100))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Prometheus-style histogram (cumulative buckets, sum, count) per label set."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # One counter per bucket, then sum and count
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            base = _labels(self.label_names, labels)
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound:g}"}} {cumulative:g}')
+            lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="+Inf"}} {series[-1]:g}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {series[-1]:g}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for labels, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{{{_labels(self.label_names, labels)}}} {value:g}")
+        return lines
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for v in values)
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time from request start to the end of the response body.",
+    ("method", "route"), LATENCY_BUCKETS,
+)
+http_requests = Counter("http_requests_total", "Requests by route and status code.", ("method", "route", "status"))
+http_request_db_queries = Histogram(
+    "http_request_db_queries", "Mongo commands issued per request; a high average on a route points at N+1 queries.",
+    ("route",), QUERY_COUNT_BUCKETS,
+)
+mongo_command_duration = Histogram(
+    "mongo_command_duration_seconds", "Mongo command round-trip time.", ("command", "collection"), LATENCY_BUCKETS,
+)
+mongo_slow_commands = Counter(
+    "mongo_slow_commands_total", f"Mongo commands slower than MONGO_SLOW_QUERY_MS ({MONGO_SLOW_QUERY_MS:g} ms).",
+    ("command", "collection", "route"),
+)
+
+
+class RequestStats:
+    """Timings of one request. Shared with Motor's executor threads through the context, hence the lock."""
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.db_queries = 0
+        self.phases: Dict[str, float] = {}
+        self.cache: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def route(self) -> str:
+        # Resolved lazily: the router fills in scope["route"] only once the request reaches it
+        return _route_label(self.scope)
+
+    def add(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+            if phase == "db":
+                self.db_queries += 1
+
+    def server_timing(self, total: float) -> str:
+        with self._lock:
+            phases = dict(self.phases)
+            queries = self.db_queries
+        entries = []
+        for phase, seconds in phases.items():
+            desc = f';desc="{queries} {"query" if queries == 1 else "queries"}"' if phase == "db" else ""
+            entries.append(f"{phase};dur={seconds * 1000:.1f}{desc}")
+        if self.cache:
+            entries.append(f'cache;desc="{self.cache}"')
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("current_request", default=None)
+
+
+def record_phase(phase: str, seconds: float) -> None:
+    """Adds time spent in `phase` (e.g. "hash", "serialize") to the current request, if any."""
+    stats = _current_request.get()
+    if stats is not None:
+        stats.add(phase, seconds)
+
+
+def record_cache(outcome: str) -> None:
+    stats = _current_request.get()
+    if stats is not None:
+        stats.cache = outcome
+
+
+@contextmanager
+def timed_phase(phase: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - started)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Attributes every Mongo command to the request that issued it.
+    Motor copies the caller's context into its executor threads, so the request's
+    RequestStats is visible here even though pymongo runs off the event loop.
+    """
+
+    def __init__(self):
+        self._collections: Dict[Tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        # Most commands name their collection as the command value; getMore carries a cursor id there instead
+        collection = event.command.get("collection") if event.command_name == "getMore" else event.command.get(event.command_name)
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else ""
+
+    def _finish(self, event, command_name: str, duration_micros: int) -> None:
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), "")
+        seconds = duration_micros / 1_000_000
+        stats = _current_request.get()
+        route = stats.route if stats else "background"
+        mongo_command_duration.observe((command_name, collection), seconds)
+        if stats is not None:
+            stats.add("db", seconds)
+        if seconds * 1000 >= MONGO_SLOW_QUERY_MS:
+            mongo_slow_commands.inc((command_name, collection, route))
+            print(f"Slow Mongo command: {command_name} on '{collection}' took {seconds * 1000:.1f} ms (route {route})", file=sys.stderr)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, event.command_name, event.duration_micros)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, event.command_name, event.duration_micros)
+
+
+mongo_command_listener = MongoCommandListener()
+
+
+def _route_label(scope: Scope) -> str:
+    # The route template (e.g. /api/blog/{post_id}) keeps the label set small; mounts and 404s share one label
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    if scope["path"].startswith("/static/"):
+        return "/static"
+    return "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """
+    Pure ASGI middleware: measures each HTTP request, records it in the histograms and
+    adds a Server-Timing header (db, hash, serialize, cache, total) to the response.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current_request.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing(time.perf_counter() - started).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = stats.route
+            http_request_duration.observe((scope["method"], route), elapsed)
+            http_requests.inc((scope["method"], route, str(status_code)))
+            http_request_db_queries.observe((route,), stats.db_queries)
+            _current_request.reset(token)
+
+
+def _gauges(prefix: str, values: Dict[str, float]) -> List[str]:
+    lines = []
+    for key, value in values.items():
+        lines.append(f"# TYPE {prefix}_{key} gauge")
+        lines.append(f"{prefix}_{key} {value:g}")
+    return lines
+
+
+def render_metrics(extra_gauges: Dict[str, Dict[str, float]]) -> str:
+    """Prometheus text exposition of every metric; `extra_gauges` maps a name prefix to point-in-time values."""
+    lines: List[str] = []
+    for metric in (http_request_duration, http_requests, http_request_db_queries, mongo_command_duration, mongo_slow_commands):
+        lines.extend(metric.render())
+    for prefix, values in extra_gauges.items():
+        lines.extend(_gauges(prefix, values))
+    return "\n".join(lines) + "\n"
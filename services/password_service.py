@@ -0,0 +1,88 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from passlib.context import CryptContext
+
+from services.metrics_service import record_phase
+
+T = TypeVar("T")
+
+# bcrypt cost factor. Hashes created with a different cost are rehashed on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# Threads dedicated to bcrypt, so hashing never competes with Motor or the default executor.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+# Hash/verify jobs allowed to run or wait at once; beyond this new jobs are rejected (e.g. a brute-force burst).
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 16))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_lock = threading.Lock()
+_pending = 0
+_metrics: Dict[str, float] = {
+    "submitted": 0,
+    "rejected": 0,
+    "completed": 0,
+    "rehashed": 0,
+    "busy_seconds": 0.0,
+    "max_pending": 0,
+}
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify jobs are already queued."""
+
+
+async def _run(fn: Callable[..., T], *args) -> T:
+    global _pending
+    with _lock:
+        if _pending >= PASSWORD_HASH_MAX_PENDING:
+            _metrics["rejected"] += 1
+            raise PasswordHasherBusy()
+        _pending += 1
+        _metrics["submitted"] += 1
+        _metrics["max_pending"] = max(_metrics["max_pending"], _pending)
+
+    def timed():
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            with _lock:
+                _metrics["busy_seconds"] += time.perf_counter() - started
+
+    submitted = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, timed)
+    finally:
+        # Includes the time spent queued behind other logins, which is what the request actually waited
+        record_phase("hash", time.perf_counter() - submitted)
+        with _lock:
+            _pending -= 1
+            _metrics["completed"] += 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(pwd_context.hash, password)
+
+
+async def verify_and_update(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password off the event loop.
+    Returns (is_valid, new_hash); new_hash is set when the stored hash should be replaced
+    because its scheme or cost no longer matches the current policy.
+    """
+    is_valid, new_hash = await _run(pwd_context.verify_and_update, password, password_hash)
+    if new_hash:
+        with _lock:
+            _metrics["rehashed"] += 1
+    return is_valid, new_hash
+
+
+def get_password_hash_metrics() -> Dict[str, float]:
+    with _lock:
+        return {**_metrics, "pending": _pending}
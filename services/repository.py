@@ -0,0 +1,212 @@
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, Generic, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Type, TypeVar, Union
+
+import bson
+from bson import ObjectId
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+
+from services.cache_service import CollectionVersion, bump_collection_version
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Field that orders skills and hobbies in their lists (see Repository.reorder)
+ORDER_FIELD = "order"
+
+class WriteEvent(NamedTuple):
+    """One write made through a Repository, as seen by write listeners."""
+    db: Any
+    collection: str
+    version: CollectionVersion # Collection version after the write
+    written: List[dict] # Inserted or updated documents, as stored
+    deleted: List[ObjectId]
+    # Updated or deleted documents before the write: their `previous_fields` only, keyed by _id
+    previous: Dict[ObjectId, dict]
+
+
+WriteListener = Callable[[WriteEvent], Awaitable[None]]
+# collection -> [(listener, fields it needs from the documents before the write)]
+_write_listeners: Dict[str, List[Tuple[WriteListener, Tuple[str, ...]]]] = {}
+
+
+def add_write_listener(collection: str, listener: WriteListener, previous_fields: Sequence[str] = ()) -> None:
+    """
+    Registers `listener` for writes made through a Repository of `collection` in this worker,
+    e.g. to keep a derived structure current without reloading the collection.
+    With `previous_fields`, updates and deletes first read those fields of the affected
+    documents (one extra query) so the listener can compute what changed.
+    Writes by other workers only show up as a version change.
+    """
+    _write_listeners.setdefault(collection, []).append((listener, tuple(previous_fields)))
+
+
+def parse_object_id(value: str, detail: str = "Invalid ID") -> ObjectId:
+    """Converts a path parameter to an ObjectId, answering 400 with `detail` when it is not one."""
+    if not ObjectId.is_valid(value):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+    return ObjectId(value)
+
+
+def creation_order() -> int:
+    """
+    Default `order` of a new item: its creation time in ms. It sorts after every position
+    written by reorder (0..n-1) and after older items, so new items land at the end of the list.
+    """
+    return int(time.time() * 1000)
+
+
+def literal(value: Any) -> dict:
+    """Wraps a value for an update pipeline, where strings starting with '$' would otherwise be read as field paths."""
+    return {"$literal": value}
+
+
+def _as_stored(doc: dict) -> dict:
+    # A BSON round-trip applies what storage does: millisecond datetimes, returned naive in UTC
+    return bson.decode(bson.encode(doc))
+
+
+class BulkOutcome(NamedTuple):
+    inserted: List[dict]
+    matched: int
+    deleted: int
+
+
+class Repository(Generic[ModelT]):
+    """
+    Typed access to one content collection.
+
+    Writes cost a single round-trip each, followed by the collection version bump that
+    invalidates cached responses:
+    - insert: the stored document is built locally instead of being read back.
+    - update: find_one_and_update returns the document as written, atomically,
+      so a concurrent edit can never be mixed into the response.
+    - bulk/reorder: any mix of inserts, updates and deletes goes out as one bulk_write.
+
+    Reads project to the fields of `model`, when one is given.
+    """
+
+    def __init__(self, db, collection: str, model: Optional[Type[ModelT]] = None):
+        self.db = db
+        self.name = collection
+        self.collection = db[collection]
+        self.model = model
+
+    @property
+    def projection(self) -> Optional[Dict[str, int]]:
+        if self.model is None:
+            return None
+        return {field.alias or name: 1 for name, field in self.model.model_fields.items()}
+
+    async def _previous(self, ids: Sequence[ObjectId]) -> Dict[ObjectId, dict]:
+        fields = {field for _, wanted in _write_listeners.get(self.name, ()) for field in wanted}
+        if not ids or not fields:
+            return {}
+        docs = await self.collection.find({"_id": {"$in": list(ids)}}, {field: 1 for field in fields}).to_list(None)
+        return {doc["_id"]: doc for doc in docs}
+
+    async def _changed(
+        self, written: Sequence[dict] = (), deleted: Sequence[ObjectId] = (), previous: Optional[Dict[ObjectId, dict]] = None,
+    ) -> None:
+        # Only after the write: bumping first would let a reader cache the old data under the new version
+        version = await bump_collection_version(self.db, self.name)
+        event = WriteEvent(self.db, self.name, version, list(written), list(deleted), previous or {})
+        for listener, _ in _write_listeners.get(self.name, ()):
+            try:
+                await listener(event)
+            except Exception as e:
+                # The write itself succeeded; a listener that fails falls back to the version check
+                print(f"🔴 ERROR (repository): Write listener on '{self.name}' failed: {e}", file=sys.stderr)
+
+    async def _written(self, ids: Sequence[ObjectId]) -> List[dict]:
+        # Bulk updates do not return documents; only read them back when someone listens
+        if not ids or not _write_listeners.get(self.name):
+            return []
+        return await self.collection.find({"_id": {"$in": list(ids)}}, self.projection).to_list(None)
+
+    async def find(
+        self,
+        filter: Optional[dict] = None,
+        sort: Optional[Sequence[Tuple[str, int]]] = None,
+        skip: int = 0,
+        limit: int = 1000,
+    ) -> List[dict]:
+        cursor = self.collection.find(filter or {}, self.projection)
+        if sort:
+            cursor = cursor.sort(list(sort))
+        return await cursor.skip(skip).limit(limit).to_list(limit)
+
+    async def get(self, doc_id: ObjectId) -> Optional[dict]:
+        return await self.collection.find_one({"_id": doc_id}, self.projection)
+
+    async def insert(self, doc: dict) -> dict:
+        """Inserts `doc` and returns it exactly as Mongo would return it on a read."""
+        doc = {key: value for key, value in doc.items() if not (key == "_id" and value is None)}
+        doc.setdefault("_id", ObjectId())
+        await self.collection.insert_one(doc)
+        stored = _as_stored(doc)
+        await self._changed([stored])
+        return stored
+
+    async def update(self, doc_id: ObjectId, update: Union[dict, list]) -> Optional[dict]:
+        """Applies an update document or pipeline; returns the updated document, or None if it does not exist."""
+        previous = await self._previous([doc_id])
+        doc = await self.collection.find_one_and_update(
+            {"_id": doc_id}, update, projection=self.projection, return_document=ReturnDocument.AFTER,
+        )
+        if doc is not None:
+            await self._changed([doc], previous=previous)
+        return doc
+
+    async def set_fields(self, doc_id: ObjectId, fields: dict) -> Optional[dict]:
+        return await self.update(doc_id, {"$set": fields})
+
+    async def delete(self, doc_id: ObjectId) -> bool:
+        previous = await self._previous([doc_id])
+        result = await self.collection.delete_one({"_id": doc_id})
+        if result.deleted_count:
+            await self._changed(deleted=[doc_id], previous=previous)
+        return bool(result.deleted_count)
+
+    async def bulk(
+        self,
+        inserts: Iterable[dict] = (),
+        updates: Iterable[Tuple[ObjectId, Union[dict, list]]] = (),
+        deletes: Iterable[ObjectId] = (),
+    ) -> BulkOutcome:
+        """
+        Runs inserts, then updates, then deletes as one ordered bulk_write.
+        The batch is not a transaction: on an error, the operations before it stay applied.
+        """
+        updates, deletes = list(updates), list(deletes)
+        new_docs = []
+        for doc in inserts:
+            doc = {key: value for key, value in doc.items() if not (key == "_id" and value is None)}
+            doc.setdefault("_id", ObjectId())
+            new_docs.append(doc)
+        requests = (
+            [InsertOne(doc) for doc in new_docs]
+            + [UpdateOne({"_id": doc_id}, update) for doc_id, update in updates]
+            + [DeleteOne({"_id": doc_id}) for doc_id in deletes]
+        )
+        if not requests:
+            return BulkOutcome([], 0, 0)
+
+        previous = await self._previous([doc_id for doc_id, _ in updates] + deletes)
+        result = await self.collection.bulk_write(requests, ordered=True)
+        inserted = [_as_stored(doc) for doc in new_docs]
+        await self._changed(inserted + await self._written([doc_id for doc_id, _ in updates]), deletes, previous)
+        return BulkOutcome(inserted, result.matched_count, result.deleted_count)
+
+    async def reorder(self, ids: Sequence[ObjectId]) -> int:
+        """Sets ORDER_FIELD to each id's position in `ids`; returns how many documents matched."""
+        if not ids:
+            return 0
+        previous = await self._previous(ids)
+        result = await self.collection.bulk_write(
+            [UpdateOne({"_id": doc_id}, {"$set": {ORDER_FIELD: position}}) for position, doc_id in enumerate(ids)],
+            ordered=False,
+        )
+        await self._changed(await self._written(ids), previous=previous)
+        return result.matched_count
@@ -0,0 +1,100 @@
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+from services.http_cache import Validators
+from services.metrics_service import record_cache
+
+# Total size of the cached bodies (and their extra headers) per worker
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    # Response headers that depend on the body, e.g. X-Next-Cursor; the validators are added on every hit
+    headers: Dict[str, str] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers.items())
+
+
+class ResponseCache:
+    """
+    LRU cache of serialized JSON responses with a byte budget.
+    Keys contain the collection version (through the ETag), so a write never has to
+    purge anything: entries for old versions stop being looked up and age out.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: Hashable, entry: CachedResponse) -> None:
+        if entry.size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def metrics(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+
+
+def get_response_cache_metrics() -> Dict[str, float]:
+    return response_cache.metrics()
+
+
+async def cached_json_response(
+    request: Request,
+    validators: Validators,
+    render: Callable[[], Awaitable[CachedResponse]],
+) -> Response:
+    """
+    Serves a public GET from the response cache, calling `render` (database + serialization) only on a miss.
+    `render` may raise HTTPException; errors are never cached.
+    """
+    key = (request.url.path, request.url.query, validators.etag)
+    entry = response_cache.get(key)
+    record_cache("miss" if entry is None else "hit")
+    if entry is None:
+        entry = await render()
+        response_cache.set(key, entry)
+    return Response(content=entry.body, media_type="application/json", headers={**validators.headers(), **entry.headers})
@@ -0,0 +1,303 @@
+import asyncio
+import heapq
+import math
+import re
+import sys
+import unicodedata
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from services.cache_service import CollectionVersion, get_collection_version
+from services.metrics_service import timed_phase
+from services.repository import WriteEvent, add_write_listener
+from services.content_service import markdown_to_text
+
+# Latin words and digits, or runs of CJK ideographs, kana and hangul
+_TOKEN_RE = re.compile(r"[0-9a-z]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+")
+
+SNIPPET_LENGTH = 160
+# Characters of context kept before the first match in a snippet
+SNIPPET_LEAD = 40
+
+# BM25 parameters: term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def _normalize(text: str) -> str:
+    # NFKC folds full-width letters and digits (Ａ, １) into their ASCII forms
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def _is_latin(token: str) -> bool:
+    return token[0] < "\u3040"
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Index terms of `text`. Latin text is split into words; CJK text has no spaces, so each
+    run is indexed as overlapping bigrams (臺北市 -> 臺北, 北市) plus single characters.
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(_normalize(text)):
+        if _is_latin(token):
+            terms.append(token)
+        else:
+            terms.extend(token)
+            terms.extend(token[i:i + 2] for i in range(len(token) - 1))
+    return terms
+
+
+def query_terms(query: str) -> List[str]:
+    """
+    Terms a query must match. A CJK run of two or more characters only needs its bigrams,
+    which keeps a query like 機器學習 from matching every post that uses 學.
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(_normalize(query)):
+        if _is_latin(token) or len(token) == 1:
+            terms.append(token)
+        else:
+            terms.extend(token[i:i + 2] for i in range(len(token) - 1))
+    return list(dict.fromkeys(terms))
+
+
+class SearchSource(NamedTuple):
+    """A collection covered by the index and how its documents are indexed."""
+    kind: str # "type" of the results, e.g. "blog"
+    collection: str
+    filter: dict # Documents outside it are not searchable (e.g. drafts)
+    fields: Dict[str, float] # Field -> weight of its terms; `content` is Markdown with HTML
+    snippet_fields: Tuple[str, ...] # Plain text the snippet is cut from, in order
+    date_field: str
+
+    def includes(self, doc: dict) -> bool:
+        return all(doc.get(key) == value for key, value in self.filter.items())
+
+    @property
+    def projection(self) -> Dict[str, int]:
+        return {field: 1 for field in (*self.fields, *self.filter, self.date_field)}
+
+
+SEARCH_SOURCES: Tuple[SearchSource, ...] = (
+    SearchSource(
+        kind="blog", collection="blog_posts", filter={"is_published": True},
+        fields={"title": 3.0, "tags": 2.0, "subtitle": 1.5, "content": 1.0},
+        snippet_fields=("content", "subtitle"), date_field="published_at",
+    ),
+    SearchSource(
+        kind="portfolio", collection="portfolio", filter={},
+        fields={"title": 3.0, "tags": 2.0, "description": 1.5, "content": 1.0},
+        snippet_fields=("description", "content"), date_field="created_at",
+    ),
+)
+
+
+class _Entry(NamedTuple):
+    kind: str
+    id: str
+    title: str
+    subtitle: Optional[str]
+    tags: List[str]
+    date: Optional[datetime]
+    text: str # Plain text the snippet is cut from
+    terms: Dict[str, float] # Term -> weighted frequency
+    length: float
+
+
+class SearchHit(NamedTuple):
+    entry: _Entry
+    score: float
+
+
+def _field_text(doc: dict, field: str) -> str:
+    value = doc.get(field)
+    if not value:
+        return ""
+    if isinstance(value, list):
+        return " ".join(str(item) for item in value)
+    return markdown_to_text(value) if field == "content" else str(value)
+
+
+def _build_entry(source: SearchSource, doc: dict) -> _Entry:
+    terms: Dict[str, float] = {}
+    length = 0.0
+    texts = {}
+    for field, weight in source.fields.items():
+        texts[field] = _field_text(doc, field)
+        for term in tokenize(texts[field]):
+            terms[term] = terms.get(term, 0.0) + weight
+            length += weight
+    text = " ".join(texts[field] for field in source.snippet_fields if texts[field])
+    return _Entry(
+        kind=source.kind, id=str(doc["_id"]), title=doc.get("title") or "", subtitle=doc.get("subtitle"),
+        tags=list(doc.get("tags") or []), date=doc.get(source.date_field), text=text, terms=terms, length=length,
+    )
+
+
+def make_snippet(text: str, query: str, length: int = SNIPPET_LENGTH) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    Cuts a window of `text` around the first match of the query and returns it with the
+    [start, end) offsets of every match inside it. Falls back to the start of the text.
+    """
+    lowered = text.lower()
+    # Whole query words first, then the bigrams a CJK run was matched by when it is not contiguous
+    needles = sorted(set(_TOKEN_RE.findall(_normalize(query))) | set(query_terms(query)), key=len, reverse=True)
+    first = min((pos for pos in (lowered.find(needle) for needle in needles) if pos >= 0), default=0)
+
+    start = max(0, first - SNIPPET_LEAD)
+    snippet = text[start:start + length]
+    highlights: List[Tuple[int, int]] = []
+    window = lowered[start:start + length]
+    for needle in needles:
+        pos = window.find(needle)
+        while pos >= 0:
+            span = (pos, pos + len(needle))
+            if not any(s < span[1] and span[0] < e for s, e in highlights):
+                highlights.append(span)
+            pos = window.find(needle, pos + len(needle))
+    highlights.sort()
+
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + length < len(text) else ""
+    return prefix + snippet + suffix, [(s + len(prefix), e + len(prefix)) for s, e in highlights]
+
+
+class SearchIndex:
+    """
+    In-process inverted index over the searchable collections of this worker.
+
+    Each collection is indexed at a collection version. Before a query, the version is checked
+    (memoized, see cache_service) and a collection that another worker changed is reloaded.
+    Writes made through a Repository in this worker are applied to the index directly, so an
+    admin edit does not cost a reload of the whole collection.
+    """
+
+    def __init__(self, sources: Sequence[SearchSource]):
+        self.sources = {source.collection: source for source in sources}
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._postings: Dict[str, Dict[Tuple[str, str], float]] = {}
+        self._total_length = 0.0
+        self._versions: Dict[str, Optional[int]] = {name: None for name in self.sources}
+        self._lock = asyncio.Lock()
+        self.rebuilds = 0
+        self.incremental_updates = 0
+
+    def _add(self, entry: _Entry) -> None:
+        key = (entry.kind, entry.id)
+        self._remove(key)
+        self._entries[key] = entry
+        self._total_length += entry.length
+        for term, weight in entry.terms.items():
+            self._postings.setdefault(term, {})[key] = weight
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._total_length -= entry.length
+        for term in entry.terms:
+            docs = self._postings.get(term)
+            if docs is not None:
+                docs.pop(key, None)
+                if not docs:
+                    del self._postings[term]
+
+    async def _reload(self, db, source: SearchSource, version: CollectionVersion) -> None:
+        docs = await db[source.collection].find(source.filter, source.projection).to_list(None)
+        for key in [key for key in self._entries if key[0] == source.kind]:
+            self._remove(key)
+        for doc in docs:
+            self._add(_build_entry(source, doc))
+        self._versions[source.collection] = version.version
+        self.rebuilds += 1
+
+    async def ensure_current(self, db) -> None:
+        """Reloads every collection whose version moved past the one it was indexed at."""
+        versions = await asyncio.gather(*(get_collection_version(db, name) for name in self.sources))
+        stale = [(self.sources[name], v) for name, v in zip(self.sources, versions) if self._versions[name] != v.version]
+        if not stale:
+            return
+        async with self._lock:
+            for source, version in stale:
+                # Another request may have reloaded it while this one waited for the lock
+                if self._versions[source.collection] != version.version:
+                    await self._reload(db, source, version)
+
+    async def on_write(self, event: WriteEvent) -> None:
+        """Repository write listener: applies one write to the index."""
+        source = self.sources[event.collection]
+        indexed = self._versions[event.collection]
+        if indexed is None or event.version.version != indexed + 1:
+            # Not indexed yet, or writes from another worker were missed: the next query reloads it
+            return
+        for doc_id in event.deleted:
+            self._remove((source.kind, str(doc_id)))
+        for doc in event.written:
+            if source.includes(doc):
+                self._add(_build_entry(source, doc))
+            else:
+                self._remove((source.kind, str(doc["_id"])))
+        self._versions[event.collection] = event.version.version
+        self.incremental_updates += 1
+
+    def search(self, query: str, kinds: Optional[Sequence[str]] = None, limit: int = 20) -> Tuple[int, List[SearchHit]]:
+        """
+        Ranks the entries that contain every query term with BM25 over the weighted fields.
+        Returns the number of matches and the best `limit` of them.
+        """
+        terms = query_terms(query)
+        postings = [self._postings.get(term) for term in terms]
+        if not terms or any(not docs for docs in postings):
+            return 0, []
+
+        # Intersect starting from the rarest term, so the candidate set only shrinks
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for docs in postings[1:]:
+            candidates.intersection_update(docs)
+        if kinds:
+            candidates = {key for key in candidates if key[0] in kinds}
+
+        total_docs = len(self._entries)
+        average_length = self._total_length / total_docs if total_docs else 1.0
+        idf = [math.log(1 + (total_docs - len(docs) + 0.5) / (len(docs) + 0.5)) for docs in postings]
+
+        def score(key: Tuple[str, str]) -> float:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self._entries[key].length / average_length)
+            total = 0.0
+            for term_idf, docs in zip(idf, postings):
+                tf = docs[key]
+                total += term_idf * tf * (BM25_K1 + 1) / (tf + norm)
+            return total
+
+        best = heapq.nlargest(limit, ((score(key), key) for key in candidates))
+        return len(candidates), [SearchHit(self._entries[key], s) for s, key in best]
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "documents": len(self._entries),
+            "terms": len(self._postings),
+            "rebuilds": self.rebuilds,
+            "incremental_updates": self.incremental_updates,
+        }
+
+
+search_index = SearchIndex(SEARCH_SOURCES)
+for _source in SEARCH_SOURCES:
+    add_write_listener(_source.collection, search_index.on_write)
+
+
+def get_search_index_metrics() -> Dict[str, float]:
+    return search_index.metrics()
+
+
+async def search(db, query: str, kinds: Optional[Sequence[str]] = None, limit: int = 20) -> Tuple[int, List[SearchHit]]:
+    """Brings the index up to date with the collection versions, then runs `query` against it."""
+    try:
+        await search_index.ensure_current(db)
+    except Exception as e:
+        # Serve from the last good index rather than failing the search
+        print(f"🔴 ERROR (search_service): Could not refresh the search index: {e}", file=sys.stderr)
+    with timed_phase("search"):
+        return search_index.search(query, kinds, limit)
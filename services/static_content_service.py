@@ -1,17 +1,57 @@
-from typing import Optional
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pydantic import BaseModel
 from models.hero_settings import HeroSettings
 from models.site_settings import SiteSettings
 from bson import ObjectId
 from fastapi import Depends
 from services.db_service import get_database
+from services.cache_service import get_collection_version, bump_collection_version
+
+SETTINGS_COLLECTION = "settings"
+
+
+class CachedSettings(NamedTuple):
+    version: int
+    model: BaseModel
+    body: bytes # Pre-serialized JSON, identical to what the response_model would produce
+
+
+# settings_id -> CachedSettings. Shared by every request handled by this worker.
+_settings_cache: Dict[str, CachedSettings] = {}
 
 
 class StaticContentService:
     def __init__(self, database: AsyncIOMotorClient):
-        self.collection: AsyncIOMotorCollection = database["settings"] # Using 'settings' collection
+        self.database = database
+        self.collection: AsyncIOMotorCollection = database[SETTINGS_COLLECTION] # Using 'settings' collection
+
+    async def _get_cached(self, settings_id: str, loader: Callable[[], Awaitable[BaseModel]]) -> CachedSettings:
+        """
+        Returns the cached settings entry, reloading it only when the collection version changed.
+        """
+        version = (await get_collection_version(self.database, SETTINGS_COLLECTION)).version
+        entry = _settings_cache.get(settings_id)
+        if entry and entry.version == version:
+            return entry
+
+        model = await loader()
+        entry = CachedSettings(version, model, model.model_dump_json(by_alias=True).encode())
+        _settings_cache[settings_id] = entry
+        return entry
+
+    async def _store_updated(self, settings_id: str, model: BaseModel) -> None:
+        """Invalidates other workers and primes the local cache with the freshly written document."""
+        version = (await bump_collection_version(self.database, SETTINGS_COLLECTION)).version
+        _settings_cache[settings_id] = CachedSettings(version, model, model.model_dump_json(by_alias=True).encode())
 
     async def get_hero_settings(self) -> HeroSettings:
+        return (await self._get_cached("hero_settings", self._load_hero_settings)).model
+
+    async def get_hero_settings_json(self) -> bytes:
+        return (await self._get_cached("hero_settings", self._load_hero_settings)).body
+
+    async def _load_hero_settings(self) -> HeroSettings:
         # Try to find the hero settings document
         settings_doc = await self.collection.find_one({"settings_id": "hero_settings"})
         if settings_doc:
@@ -41,10 +81,18 @@ class StaticContentService:
             upsert=True # Create the document if it doesn't exist
         )
         if updated_doc:
-            return HeroSettings.parse_obj(updated_doc)
+            updated_settings = HeroSettings.parse_obj(updated_doc)
+            await self._store_updated("hero_settings", updated_settings)
+            return updated_settings
         return None # Should ideally not happen if get_hero_settings creates it
 
     async def get_site_settings(self) -> SiteSettings:
+        return (await self._get_cached("site_settings", self._load_site_settings)).model
+
+    async def get_site_settings_json(self) -> bytes:
+        return (await self._get_cached("site_settings", self._load_site_settings)).body
+
+    async def _load_site_settings(self) -> SiteSettings:
         settings_doc = await self.collection.find_one({"settings_id": "site_settings"})
         if settings_doc:
             return SiteSettings.parse_obj(settings_doc)
@@ -158,7 +206,9 @@ class StaticContentService:
             upsert=True
         )
         if updated_doc:
-            return SiteSettings.parse_obj(updated_doc)
+            updated_settings = SiteSettings.parse_obj(updated_doc)
+            await self._store_updated("site_settings", updated_settings)
+            return updated_settings
         return None
 
 
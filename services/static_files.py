@@ -0,0 +1,127 @@
+import mimetypes
+import os
+import re
+import stat
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+# Upload names that can never change content: SHA-256 (optionally with a "-640w" variant suffix) or UUID
+_IMMUTABLE_NAME_RE = re.compile(
+    r"^(?:[0-9a-f]{64}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})(?:-\d+w)?\.[A-Za-z0-9]+$"
+)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+
+# Pre-built siblings tried in order of preference: (Accept-Encoding token, file suffix)
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Files above this size are sent in bigger chunks, so fewer event-loop round trips per byte
+LARGE_FILE_BYTES = 1024 * 1024
+LARGE_FILE_CHUNK_SIZE = 1024 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parses a single-range `Range` header into inclusive (start, end). Multi-range requests get the full body."""
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    if not match.group(1):
+        # Suffix range: the last N bytes
+        length = int(match.group(2))
+        if length == 0:
+            raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        return max(0, size - length), size - 1
+    start = int(match.group(1))
+    end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+class RangeFileResponse(FileResponse):
+    """FileResponse that sends only bytes [start, end] with a 206 status."""
+
+    def __init__(self, path, start: int, end: int, size: int, **kwargs):
+        super().__init__(path, status_code=206, **kwargs)
+        self.start = start
+        self.end = end
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with long-lived caching for content-addressed uploads, pre-compressed
+    .br/.gz siblings, single byte ranges and large-chunk reads for big files.
+    Servers that offer the ASGI `http.response.pathsend` extension get the path handed
+    over directly (zero-copy); behind nginx, /static is best served by nginx itself.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        # Hide dotfiles and dot-directories such as static/uploads/.tmp (partial uploads)
+        if any(part.startswith(".") for part in path.split(os.sep)):
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        name = os.path.basename(str(full_path))
+        headers = {
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if _IMMUTABLE_NAME_RE.match(name) else DEFAULT_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+            "Accept-Ranges": "bytes",
+        }
+
+        served_path, served_stat = str(full_path), stat_result
+        accept_encoding = request_headers.get("accept-encoding", "")
+        if status_code == 200 and "range" not in request_headers:
+            for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+                if encoding in accept_encoding:
+                    candidate = str(full_path) + suffix
+                    try:
+                        candidate_stat = os.stat(candidate)
+                    except OSError:
+                        continue
+                    if stat.S_ISREG(candidate_stat.st_mode):
+                        served_path, served_stat = candidate, candidate_stat
+                        headers["Content-Encoding"] = encoding
+                        break
+
+        # media_type comes from the original name, not the .br/.gz sibling
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        byte_range = _parse_range(request_headers.get("range"), served_stat.st_size) if status_code == 200 else None
+        if byte_range:
+            response = RangeFileResponse(served_path, *byte_range, served_stat.st_size, headers=headers, media_type=media_type, stat_result=served_stat)
+        else:
+            response = FileResponse(served_path, status_code=status_code, headers=headers, media_type=media_type, stat_result=served_stat)
+        if served_stat.st_size > LARGE_FILE_BYTES:
+            response.chunk_size = LARGE_FILE_CHUNK_SIZE
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,81 @@
+import os
+import re
+import time
+from typing import Iterable, List, Set
+
+from services.image_service import MEDIA_COLLECTION, UPLOAD_DIR, VARIANT_DIR, variant_filename
+
+# Collections whose documents may point at files in UPLOAD_DIR (image fields, inline HTML, settings)
+REFERENCING_COLLECTIONS = ("portfolio", "blog_posts", "settings")
+
+_UPLOAD_REF_RE = re.compile(r"/static/uploads/([A-Za-z0-9._-]+)")
+# Files stored by /api/upload are named by the SHA-256 of their content. Anything else predates
+# it (UUID names, files committed to git) and may be referenced from outside the database,
+# e.g. the About section's default image in the frontend, so it is never collected by default.
+_MANAGED_UPLOAD_RE = re.compile(r"[0-9a-f]{64}\.[a-z0-9]+")
+
+
+def _strings(value) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _strings(item)
+
+
+async def referenced_uploads(db) -> Set[str]:
+    """Reachability scan: names of every upload referenced anywhere in the content collections."""
+    names: Set[str] = set()
+    for collection in REFERENCING_COLLECTIONS:
+        async for doc in db[collection].find({}):
+            for text in _strings(doc):
+                names.update(_UPLOAD_REF_RE.findall(text))
+    return names
+
+
+def stored_uploads() -> List[str]:
+    if not os.path.isdir(UPLOAD_DIR):
+        return []
+    return [
+        name for name in os.listdir(UPLOAD_DIR)
+        if not name.startswith(".") and os.path.isfile(os.path.join(UPLOAD_DIR, name))
+    ]
+
+
+def is_managed_upload(name: str) -> bool:
+    return _MANAGED_UPLOAD_RE.fullmatch(name) is not None
+
+
+async def find_orphans(db, min_age_seconds: float, include_legacy: bool = False) -> List[str]:
+    """
+    Uploads that nothing references. Files younger than `min_age_seconds` are kept,
+    because an admin may have uploaded them for a form that is not saved yet.
+    Only files named by the upload pipeline are candidates unless `include_legacy` is set.
+    """
+    referenced = await referenced_uploads(db)
+    cutoff = time.time() - min_age_seconds
+    return sorted(
+        name for name in stored_uploads()
+        if name not in referenced
+        and (include_legacy or is_managed_upload(name))
+        and os.path.getmtime(os.path.join(UPLOAD_DIR, name)) < cutoff
+    )
+
+
+async def remove_upload(db, filename: str) -> int:
+    """Deletes an upload, its variants and its media record. Returns the number of bytes freed."""
+    media_doc = await db[MEDIA_COLLECTION].find_one({"_id": filename}, {"variants": 1})
+    paths = [os.path.join(UPLOAD_DIR, filename)]
+    if media_doc:
+        paths += [os.path.join(VARIANT_DIR, variant_filename(filename, v["width"])) for v in media_doc.get("variants", [])]
+
+    freed = 0
+    for path in paths:
+        if os.path.exists(path):
+            freed += os.path.getsize(path)
+            os.remove(path)
+    await db[MEDIA_COLLECTION].delete_one({"_id": filename})
+    return freed
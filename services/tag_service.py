@@ -0,0 +1,111 @@
+import sys
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from pymongo import DeleteMany, UpdateOne
+
+from services.cache_service import VERSIONS_COLLECTION, bump_collection_version
+from services.repository import WriteEvent, add_write_listener
+
+# Materialized tag cloud: one {kind, tag, count} document per tag in use
+TAG_COUNTS_COLLECTION = "tag_counts"
+
+
+class TagSource(NamedTuple):
+    kind: str # `kind` of its tag_counts documents, e.g. "blog"
+    collection: str
+    filter: dict # Only these documents are counted (e.g. published posts)
+
+    def tags_of(self, doc: Optional[dict]) -> Set[str]:
+        if not doc or not all(doc.get(key) == value for key, value in self.filter.items()):
+            return set()
+        return set(doc.get("tags") or [])
+
+
+TAG_SOURCES: Dict[str, TagSource] = {
+    source.collection: source for source in (
+        TagSource("blog", "blog_posts", {"is_published": True}),
+        TagSource("portfolio", "portfolio", {}),
+    )
+}
+
+
+def tag_deltas(source: TagSource, event: WriteEvent) -> Counter:
+    """How much each tag's count changes with one write, from the documents before and after it."""
+    deltas: Counter = Counter()
+    for doc_id in event.deleted:
+        deltas.subtract(source.tags_of(event.previous.get(doc_id)))
+    for doc in event.written:
+        deltas.update(source.tags_of(doc))
+        deltas.subtract(source.tags_of(event.previous.get(doc["_id"])))
+    return Counter({tag: delta for tag, delta in deltas.items() if delta})
+
+
+async def apply_tag_deltas(db, kind: str, deltas: Counter) -> None:
+    """$inc the changed counts in one bulk_write and drop tags no longer in use."""
+    if not deltas:
+        return
+    requests = [
+        UpdateOne({"kind": kind, "tag": tag}, {"$inc": {"count": delta}}, upsert=True)
+        for tag, delta in deltas.items()
+    ]
+    dropped = [tag for tag, delta in deltas.items() if delta < 0]
+    if dropped:
+        requests.append(DeleteMany({"kind": kind, "tag": {"$in": dropped}, "count": {"$lte": 0}}))
+    await db[TAG_COUNTS_COLLECTION].bulk_write(requests, ordered=True)
+    await bump_collection_version(db, TAG_COUNTS_COLLECTION)
+
+
+async def _on_write(event: WriteEvent) -> None:
+    source = TAG_SOURCES[event.collection]
+    await apply_tag_deltas(event.db, source.kind, tag_deltas(source, event))
+
+
+for _source in TAG_SOURCES.values():
+    # The published flag is needed too: publishing or unpublishing a post moves all of its tags
+    add_write_listener(_source.collection, _on_write, previous_fields=("tags", *_source.filter))
+
+
+async def get_tag_counts(db, kinds: Optional[Iterable[str]] = None) -> List[dict]:
+    """Tags in use, most used first; a tag used by posts and portfolio items appears once per kind."""
+    query = {"count": {"$gt": 0}}
+    if kinds:
+        query["kind"] = {"$in": list(kinds)}
+    cursor = db[TAG_COUNTS_COLLECTION].find(query, {"_id": 0, "kind": 1, "tag": 1, "count": 1})
+    return await cursor.sort([("count", -1), ("tag", 1)]).to_list(None)
+
+
+async def rebuild_tag_counts(db) -> int:
+    """
+    Recounts every tag from the source collections (a full scan of each) and replaces the
+    materialized counts. Only needed to backfill them once, or to repair them.
+    Returns the number of tags written.
+    """
+    total = 0
+    for source in TAG_SOURCES.values():
+        pipeline = [
+            {"$match": {**source.filter, "tags.0": {"$exists": True}}},
+            # A tag listed twice on one document counts once, as in tag_deltas
+            {"$project": {"tags": {"$setUnion": ["$tags", []]}}},
+            {"$unwind": "$tags"},
+            {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+        ]
+        rows = await db[source.collection].aggregate(pipeline).to_list(None)
+        await db[TAG_COUNTS_COLLECTION].delete_many({"kind": source.kind})
+        if rows:
+            await db[TAG_COUNTS_COLLECTION].insert_many(
+                [{"kind": source.kind, "tag": row["_id"], "count": row["count"]} for row in rows]
+            )
+        total += len(rows)
+    await bump_collection_version(db, TAG_COUNTS_COLLECTION)
+    return total
+
+
+async def ensure_tag_counts(db) -> None:
+    """Builds the tag counts on the first startup: they have never been written if their version doc is missing."""
+    try:
+        if await db[VERSIONS_COLLECTION].find_one({"_id": TAG_COUNTS_COLLECTION}) is None:
+            tags = await rebuild_tag_counts(db)
+            print(f"✅ Tag counts built: {tags} tags")
+    except Exception as e:
+        print(f"⚠️ WARNING (tag_service): Could not build tag counts: {e}", file=sys.stderr)
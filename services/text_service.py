@@ -0,0 +1,14 @@
+import html
+import re
+from typing import Optional
+
+# A tag, possibly cut off at the end; a "<" followed by a space or digit is text ("a < b")
+_TAG_RE = re.compile(r"<[A-Za-z/!?][^>]*>?")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def html_to_text(markup: Optional[str]) -> str:
+    """Plain text of an HTML fragment: tags removed, entities decoded, whitespace collapsed."""
+    if not markup:
+        return ""
+    return _WHITESPACE_RE.sub(" ", html.unescape(_TAG_RE.sub(" ", markup))).strip()
@@ -0,0 +1,31 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# CPU-heavy jobs (image resizing, HTML analysis) run in worker processes so they neither
+# block the event loop nor hold the GIL of the web worker.
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", 2))
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=WORKER_PROCESSES)
+    return _process_pool
+
+
+async def run_in_process(fn: Callable[..., T], *args) -> T:
+    """Runs a picklable, module-level function in the shared process pool."""
+    return await asyncio.get_running_loop().run_in_executor(get_process_pool(), fn, *args)
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
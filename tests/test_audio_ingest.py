@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from services.audio_ingest import STT_SAMPLE_RATE, AudioIngest
+
+INPUT_RATE = 48000
+
+
+def tone(frequency, seconds, rate=INPUT_RATE, amplitude=10000):
+    t = np.arange(int(rate * seconds)) / rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype("<i2").tobytes()
+
+
+def feed(ingest, data, chunk_bytes=2048):
+    return b"".join(ingest.process(data[i:i + chunk_bytes]) for i in range(0, len(data), chunk_bytes))
+
+
+def samples(data):
+    return np.frombuffer(data, dtype="<i2").astype(np.float64)
+
+
+def gain_db(frequency, rate=INPUT_RATE):
+    ingest = AudioIngest(rate, vad_dbfs=-200) # Gate always open
+    out = samples(feed(ingest, tone(frequency, 1, rate)))[1000:] # Skip the filter's start-up
+    amplitude = np.sqrt(2 * np.mean(out * out)) / 10000
+    return 20 * np.log10(max(amplitude, 1e-9))
+
+
+@pytest.mark.parametrize("rate", [48000, 44100])
+@pytest.mark.parametrize("frequency", [300, 1000, 3000, 6000])
+def test_speech_band_passes(rate, frequency):
+    assert abs(gain_db(frequency, rate)) < 1
+
+
+@pytest.mark.parametrize("rate", [48000, 44100])
+@pytest.mark.parametrize("frequency", [9000, 12000, 14000, 20000])
+def test_frequencies_above_output_nyquist_do_not_alias(rate, frequency):
+    assert gain_db(frequency, rate) < -40
+
+
+def test_output_rate():
+    ingest = AudioIngest(INPUT_RATE, vad_dbfs=-200)
+    out = feed(ingest, tone(1000, 1))
+    assert ingest.output_rate == STT_SAMPLE_RATE
+    assert abs(len(out) // 2 - STT_SAMPLE_RATE) <= 1
+
+
+@pytest.mark.parametrize("rate", [48000, 44100])
+@pytest.mark.parametrize("chunk_bytes", [2048, 1023, 1])
+def test_chunking_does_not_change_the_output(rate, chunk_bytes):
+    data = tone(440, 0.3, rate) + tone(2500, 0.3, rate)
+    whole = AudioIngest(rate, vad_dbfs=-200).process(data)
+    # Odd chunk sizes split samples across chunks; the leftover byte is carried over
+    assert feed(AudioIngest(rate, vad_dbfs=-200), data, chunk_bytes) == whole
+
+
+def test_gate_keeps_hangover_and_preroll_around_speech():
+    silence = bytes(2 * INPUT_RATE * 3)
+    speech = tone(440, 0.5)
+    ingest = AudioIngest(INPUT_RATE, vad_dbfs=-50, hangover_ms=1200, preroll_ms=300)
+
+    assert feed(ingest, silence) == b"" # Starts closed
+    first = feed(ingest, speech + silence)
+    second = feed(ingest, speech)
+
+    chunk = 2048 // 2 // 3 # Output samples per input chunk; the gate decides chunk by chunk
+    first_samples = len(first) // 2
+    assert abs(first_samples - STT_SAMPLE_RATE * (0.5 + 1.2) - 300 * 16) <= 2 * chunk
+    second_samples = len(second) // 2
+    assert abs(second_samples - STT_SAMPLE_RATE * (0.5 + 0.3)) <= 2 * chunk
+    # The pre-roll replayed before the second utterance is silence
+    assert not samples(second)[:STT_SAMPLE_RATE * 3 // 10 - chunk].any()
+
+
+def test_stats_account_for_every_byte():
+    ingest = AudioIngest(INPUT_RATE, vad_dbfs=-50)
+    data = tone(440, 0.5) + bytes(2 * INPUT_RATE * 2) + b"\x01" # Odd length on purpose
+    sent = sum(len(ingest.process(data[i:i + 777])) for i in range(0, len(data), 777))
+    stats = ingest.stats()
+    assert stats["bytes_in"] == len(data)
+    assert stats["bytes_out"] == sent
+    assert stats["bytes_saved"] == len(data) - sent
+    assert stats["saved_ratio"] == round((len(data) - sent) / len(data), 3)
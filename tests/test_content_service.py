@@ -0,0 +1,59 @@
+import re
+
+import pytest
+
+from services.content_service import analyze_content, sanitize_content
+
+
+def sanitize(content):
+    return sanitize_content(content)[0]
+
+
+@pytest.mark.parametrize("payload", [
+    # Backticks in attribute values must not turn part of the tag into a code span
+    '<img src=x alt="`a`" onerror=alert(1)>',
+    '<a href="`x`" onclick="alert(1)">',
+    # Tag names that look like autolinks
+    '<a:b onmouseover="alert(1)">hi',
+    '<x@y onclick=alert(1)>z',
+    # Unfinished tags at the end of the content
+    '<img src=x onerror=alert(1)',
+    '<img src=x alt="`a` onerror=alert(1)',
+    # An escaped backtick does not open a code span
+    '\\`<img src=x onerror=alert(1)>`',
+    # Backticks inside HTML blocks are raw HTML, not code
+    '<div>\n`<img src=x onerror=alert(1)>`\n</div>',
+    '<pre>\n\n`<img src=x onerror=alert(1)>`\n</pre>',
+    '<script>alert(1)</script>',
+    '<a href="javascript:alert(1)">x</a>',
+])
+def test_event_handlers_and_scripts_are_removed(payload):
+    clean = sanitize(payload)
+    assert "<script" not in clean
+    assert "javascript:" not in clean
+    # Whatever survives as a tag carries no event handler; the rest is escaped text
+    for tag in re.findall(r"<[^<]*", clean):
+        assert not re.search(r"\son\w+\s*=", tag), clean
+
+
+def test_unsafe_autolink_is_escaped():
+    assert sanitize("<javascript:alert(1)>") == "&lt;javascript:alert(1)>"
+
+
+def test_autolinks_are_kept():
+    content = "see <https://example.com/a?b=1> and <me@example.org>"
+    assert sanitize(content) == content
+
+
+def test_markdown_code_is_kept_verbatim():
+    content = "Use `<img onerror=x>` inline\n\n```html\n<script>x</script>\n```\n\ntext `a` b"
+    assert sanitize(content) == content
+
+
+def test_allowed_html_is_kept():
+    assert sanitize('<p class="note">a < b <b>bold</b></p>') == '<p class="note">a < b <b>bold</b></p>'
+
+
+def test_toc_skips_fenced_code():
+    toc = analyze_content("# Hello\n\n```\n# not a heading\n```\n")["toc"]
+    assert toc == [{"level": 1, "text": "Hello", "id": "hello"}]